@@ -719,6 +719,12 @@ def system_status():
                 'file_manager': file_manager is not None
             }
         }
+        if orchestrator is not None:
+            # Response caches are process-wide, so these counters cover every session
+            status['cache'] = {
+                'deepseek': orchestrator.deepseek_client.cache_stats(),
+                'ollama': orchestrator.ollama_client.cache_stats()
+            }
         
         return jsonify(status)
         
@@ -1432,10 +1438,21 @@ def api_download_document(session_id, filename):
         if not doc:
             return jsonify({'error': 'Document not found'}), 404
         
+        # Documents are kept on disk; sessions saved before that still carry the content inline
+        if 'content' in doc:
+            content = doc['content']
+        else:
+            with open(doc['filepath'], 'r', encoding='utf-8') as f:
+                content = f.read()
+            # The saved file starts with a title heading the document itself never had
+            header = f"# {doc['title']}\n\n"
+            if content.startswith(header):
+                content = content[len(header):]
+        
         # Create in-memory file
         from io import BytesIO
         memory_file = BytesIO()
-        memory_file.write(doc['content'].encode('utf-8'))
+        memory_file.write(content.encode('utf-8'))
         memory_file.seek(0)
         
         return send_file(
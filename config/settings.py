@@ -21,6 +21,11 @@ class Config:
     DEEPSEEK_CONTEXT_WINDOW = int(os.getenv('DEEPSEEK_CONTEXT_WINDOW', '128000'))
     DEEPSEEK_DEFAULT_TEMPERATURE = float(os.getenv('DEEPSEEK_DEFAULT_TEMPERATURE', '0.7'))
     DEEPSEEK_DEFAULT_MAX_TOKENS = int(os.getenv('DEEPSEEK_DEFAULT_MAX_TOKENS', '4096'))
+    DEEPSEEK_MAX_CONTEXT_CHARS = int(os.getenv('DEEPSEEK_MAX_CONTEXT_CHARS', '50000'))  # Cap on research context embedded per call
+    OLLAMA_TRUNCATE_TOKENS = int(os.getenv('OLLAMA_TRUNCATE_TOKENS', '250'))  # Ollama reply quoted back in discussion turns
+    DEEPSEEK_MULTI_DOC_MIN_TOKENS = int(os.getenv('DEEPSEEK_MULTI_DOC_MIN_TOKENS', '3750'))  # Input size that warrants the multi-document suite
+    DEEPSEEK_COMPRESS_CONTEXT_MIN_TOKENS = int(os.getenv('DEEPSEEK_COMPRESS_CONTEXT_MIN_TOKENS', '6000'))  # Summarize research above this before document generation
+    DEEPSEEK_COMPRESSED_CONTEXT_TOKENS = int(os.getenv('DEEPSEEK_COMPRESSED_CONTEXT_TOKENS', '3000'))  # Cap on that summary
     
     # DeepSeek token limits per stage
     DEEPSEEK_STAGE1_MAX_TOKENS = int(os.getenv('DEEPSEEK_STAGE1_MAX_TOKENS', '8000'))
@@ -29,6 +34,7 @@ class Config:
     DEEPSEEK_STAGE5_MAX_TOKENS = int(os.getenv('DEEPSEEK_STAGE5_MAX_TOKENS', '4000'))
     DEEPSEEK_STAGE7_MAX_TOKENS = int(os.getenv('DEEPSEEK_STAGE7_MAX_TOKENS', '8000'))
     DEEPSEEK_STAGE9_MAX_TOKENS = int(os.getenv('DEEPSEEK_STAGE9_MAX_TOKENS', '8000'))
+    DEEPSEEK_VALIDATION_MAX_TOKENS = int(os.getenv('DEEPSEEK_VALIDATION_MAX_TOKENS', '300'))  # Per quality criterion
     
     # ============================================================================
     # Ollama Settings
@@ -39,16 +45,24 @@ class Config:
     OLLAMA_DEFAULT_TEMPERATURE = float(os.getenv('OLLAMA_DEFAULT_TEMPERATURE', '0.7'))
     OLLAMA_DEFAULT_MAX_TOKENS = int(os.getenv('OLLAMA_DEFAULT_MAX_TOKENS', '32768'))
     OLLAMA_TIMEOUT = int(os.getenv('OLLAMA_TIMEOUT', '90000'))  # default for deep analysis
+    OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')  # How long the server keeps the model loaded after a request
+    OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', '10'))  # Keep-alive connections held open to Ollama
+    OLLAMA_PREWARM = os.getenv('OLLAMA_PREWARM', 'True').lower() in ('true', '1', 'yes')  # Load the model in the background at startup
+    OLLAMA_PREWARM_TIMEOUT = int(os.getenv('OLLAMA_PREWARM_TIMEOUT', '120'))  # Seconds to wait for that load before giving up
     
     # Ollama token limits for different operations
     OLLAMA_REVIEW_MAX_TOKENS = int(os.getenv('OLLAMA_REVIEW_MAX_TOKENS', '8192'))
     OLLAMA_DISCUSSION_MAX_TOKENS = int(os.getenv('OLLAMA_DISCUSSION_MAX_TOKENS', '12288'))
     OLLAMA_VALIDATION_MAX_TOKENS = int(os.getenv('OLLAMA_VALIDATION_MAX_TOKENS', '4096'))
+    OLLAMA_DISCUSSION_QUOTE_TOKENS = int(os.getenv('OLLAMA_DISCUSSION_QUOTE_TOKENS', '500'))  # DeepSeek reply quoted back in discussion turns
+    OLLAMA_REVISE_OUTLINE_TOKENS = int(os.getenv('OLLAMA_REVISE_OUTLINE_TOKENS', '1250'))  # Outline included when revising a document
+    OLLAMA_REVISE_DOCUMENT_TOKENS = int(os.getenv('OLLAMA_REVISE_DOCUMENT_TOKENS', '3750'))  # Leading part of the draft included when revising
     
     # NEW: Optimized workflow - Ollama generates, DeepSeek reviews
     OLLAMA_DOCUMENT_WRITE_MAX_TOKENS = int(os.getenv('OLLAMA_DOCUMENT_WRITE_MAX_TOKENS', '32000'))  # Full capacity for writing
     OLLAMA_DOCUMENT_REVISE_MAX_TOKENS = int(os.getenv('OLLAMA_DOCUMENT_REVISE_MAX_TOKENS', '32000'))  # Full capacity for revision
     DEEPSEEK_OUTLINE_MAX_TOKENS = int(os.getenv('DEEPSEEK_OUTLINE_MAX_TOKENS', '8000'))  # Detailed outlines for full dev cycle
+    DEEPSEEK_OUTLINE_PARALLEL_PHASES = os.getenv('DEEPSEEK_OUTLINE_PARALLEL_PHASES', 'False').lower() in ('true', '1', 'yes')  # One concurrent request per outline phase
     DEEPSEEK_RESEARCH_SUMMARY_MAX_TOKENS = int(os.getenv('DEEPSEEK_RESEARCH_SUMMARY_MAX_TOKENS', '6000'))  # Comprehensive research
     DEEPSEEK_REVIEW_MAX_TOKENS = int(os.getenv('DEEPSEEK_REVIEW_MAX_TOKENS', '8000'))  # Technical accuracy reviews
     
@@ -71,6 +85,23 @@ class Config:
     MAX_CONVERSATION_ROUNDS = int(os.getenv('MAX_CONVERSATION_ROUNDS', '50'))
     MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', '15'))
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '300'))  # 5 minutes default
+    CONNECT_TIMEOUT = int(os.getenv('CONNECT_TIMEOUT', '10'))  # Fail fast when the API host is unreachable
+    DEEPSEEK_CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('DEEPSEEK_CIRCUIT_BREAKER_THRESHOLD', '5'))  # Consecutive outage failures before failing fast (0 disables)
+    DEEPSEEK_CIRCUIT_BREAKER_COOLDOWN = int(os.getenv('DEEPSEEK_CIRCUIT_BREAKER_COOLDOWN', '60'))  # Seconds before a probe request is let through
+    DEEPSEEK_MAX_CONCURRENT_REQUESTS = int(os.getenv('DEEPSEEK_MAX_CONCURRENT_REQUESTS', '4'))  # Parallel document generation
+    
+    # ============================================================================
+    # LLM Response Cache
+    # ============================================================================
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '3600'))  # seconds
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '256'))
+    LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0.5'))  # Don't cache intentionally varied outputs
+    LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', '')  # Persist cached responses across restarts (empty = memory only)
+    LLM_DETERMINISTIC = os.getenv('LLM_DETERMINISTIC', 'False').lower() in ('true', '1', 'yes')  # Send every request at temperature 0
+    LLM_SEMANTIC_CACHE_ENABLED = os.getenv('LLM_SEMANTIC_CACHE_ENABLED', 'False').lower() in ('true', '1', 'yes')  # Needs sentence-transformers and LLM_DETERMINISTIC
+    LLM_SEMANTIC_CACHE_MODEL = os.getenv('LLM_SEMANTIC_CACHE_MODEL', 'all-MiniLM-L6-v2')
+    LLM_SEMANTIC_CACHE_THRESHOLD = float(os.getenv('LLM_SEMANTIC_CACHE_THRESHOLD', '0.92'))  # Cosine similarity for a hit
     
     # ============================================================================
     # File Storage
@@ -89,6 +120,7 @@ class Config:
     # ============================================================================
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'ai_research_system.log')
+    RESEARCH_AI_MEMPROF = os.getenv('RESEARCH_AI_MEMPROF', '0').lower() in ('true', '1', 'yes')  # tracemalloc diff around document generation
     
     @classmethod
     def validate_config(cls):
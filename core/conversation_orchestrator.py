@@ -10,13 +10,34 @@ from core.models import (
     ResearchContext, LLMMessage, LLMType, ConversationStage, 
     SearchResult, QualityLevel
 )
-from core.deepseek_client import DeepSeekClient
+from core.deepseek_client import DeepSeekClient, _extract_first_json
 from core.ollama_client import OllamaClient
 from core.serper_client import SerperClient
 from utils.file_manager import FileManager
 
 logger = logging.getLogger(__name__)
 
+_JSON_BLOCK_RE = re.compile(r'```json\s*(\[.*?\])\s*```', re.DOTALL)
+_NUMBERED_LINE_RE = re.compile(r'^\d+\.?\s+["\']?(.+?)["\']?\s*$')
+_QUERY_WORD_RE = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+
+# Queries whose word sets overlap at least this much (Jaccard) would return the same results
+_QUERY_DUP_SIMILARITY = 0.75
+
+
+def _dedupe_queries(queries: List[str]) -> List[str]:
+    """Drop queries that are near-duplicates (by word overlap) of an earlier query, keeping order"""
+    kept, kept_words = [], []
+    for query in queries:
+        words = frozenset(_QUERY_WORD_RE.findall(str(query).lower()))
+        if not words:
+            continue
+        if any(len(words & other) / len(words | other) >= _QUERY_DUP_SIMILARITY for other in kept_words):
+            continue
+        kept.append(query)
+        kept_words.append(words)
+    return kept
+
 
 class ConversationOrchestrator:
     """
@@ -59,31 +80,21 @@ class ConversationOrchestrator:
         
         Strategies:
         1. Find ```json ... ```
-        2. Find [...] with bracket matching
+        2. First complete [...] array (bracket matching via the JSON decoder)
         3. Parse line by line as fallback
         """
         # Strategy 1: JSON code block
-        code_block_match = re.search(r'```json\s*(\[.*?\])\s*```', content, re.DOTALL)
+        code_block_match = _JSON_BLOCK_RE.search(content)
         if code_block_match:
             try:
                 return json.loads(code_block_match.group(1))
             except json.JSONDecodeError:
                 pass
         
-        # Strategy 2: Find [...] with proper nesting
-        start_idx = content.find('[')
-        if start_idx != -1:
-            depth = 0
-            for i in range(start_idx, len(content)):
-                if content[i] == '[':
-                    depth += 1
-                elif content[i] == ']':
-                    depth -= 1
-                    if depth == 0:
-                        try:
-                            return json.loads(content[start_idx:i+1])
-                        except json.JSONDecodeError:
-                            break
+        # Strategy 2: Find [...] with proper nesting (brackets inside strings don't count)
+        array = _extract_first_json(content, list)
+        if array is not None:
+            return array
         
         # Strategy 3: Line by line fallback
         lines = [line.strip() for line in content.split('\n')]
@@ -92,8 +103,8 @@ class ConversationOrchestrator:
             # Look for quoted strings or numbered lists
             if line.startswith('"') and line.endswith('"'):
                 queries.append(line.strip('"'))
-            elif re.match(r'^\d+\.?\s+["\']?(.+)["\']?$', line):
-                match = re.match(r'^\d+\.?\s+["\']?(.+?)["\']?\s*$', line)
+            else:
+                match = _NUMBERED_LINE_RE.match(line)
                 if match:
                     queries.append(match.group(1).strip('"\''))
         
@@ -229,6 +240,12 @@ Generate the JSON array now:"""
                 f"{context.user_prompt} complete example project"
             ]
         
+        # Near-identical queries cost a search call each and return the same sources
+        unique_queries = _dedupe_queries(queries)
+        if len(unique_queries) < len(queries):
+            logger.info(f"Dropped {len(queries) - len(unique_queries)} near-duplicate research queries")
+        queries = unique_queries
+        
         context.metadata['research_queries'] = queries
         logger.info(f"✅ Generated {len(queries)} research queries")
         
@@ -455,28 +472,44 @@ Be comprehensive - use up to 8,000 tokens for this analysis."""
         
         outlines = []
         
-        for idx, doc in enumerate(documents):
-            self._update_status(
-                "DeepSeek",
-                f"Stage 4/5: Planning ({idx+1}/{len(documents)})",
-                f"Creating outline for: {doc['title']}"
-            )
-            
-            outline = self.deepseek_client.create_document_outline(
-                doc_number=idx+1,
-                doc_type=doc['title'],
-                user_prompt=context.user_prompt,
-                research_context=research_analysis,
-                conversation_summary=research_analysis[:8000]
-            )
-            
-            outlines.append({
-                "title": doc['title'],
-                "outline": outline.content,
-                "focus": doc['focus']
-            })
+        self._update_status(
+            "DeepSeek",
+            f"Stage 4/5: Planning (0/{len(documents)})",
+            f"Creating {len(documents)} outlines in parallel..."
+        )
+        
+        # Outlines are independent of each other - request them concurrently (bounded for rate limits)
+        max_workers = max(1, min(len(documents), Config.DEEPSEEK_MAX_CONCURRENT_REQUESTS))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self.deepseek_client.create_document_outline,
+                    doc_number=idx+1,
+                    doc_type=doc['title'],
+                    user_prompt=context.user_prompt,
+                    research_context=research_analysis,
+                    conversation_summary=research_analysis[:8000]
+                )
+                for idx, doc in enumerate(documents)
+            ]
             
-            logger.info(f"✓ Outline {idx+1}/4 created ({len(outline.content)} chars)")
+            # Collect in document order so Stage 5 writes them in the planned sequence
+            for idx, (doc, future) in enumerate(zip(documents, futures)):
+                outline = future.result()
+                
+                outlines.append({
+                    "title": doc['title'],
+                    "outline": outline.content,
+                    "focus": doc['focus']
+                })
+                
+                logger.info(f"✓ Outline {idx+1}/{len(documents)} created ({len(outline.content)} chars)")
+                
+                self._update_status(
+                    "DeepSeek",
+                    f"Stage 4/5: Planning ({idx+1}/{len(documents)})",
+                    f"Created outline for: {doc['title']}"
+                )
         
         context.metadata['document_outlines'] = outlines
         
@@ -556,25 +589,29 @@ Be comprehensive - use up to 8,000 tokens for this analysis."""
             content=document.content
         )
         
+        # The text lives on disk from here on - keep only metadata so sessions don't hold every document
+        word_count = len(document.content.split())
+        char_count = len(document.content)
+        del document
+        
         completed.append({
             "title": current_outline['title'],
             "filename": filename,
             "filepath": saved_path,
-            "content": document.content,
-            "word_count": len(document.content.split()),
-            "char_count": len(document.content)
+            "word_count": word_count,
+            "char_count": char_count
         })
         
         context.metadata['completed_documents'] = completed
         context.metadata['current_document_index'] = current_idx + 1
         
-        logger.info(f"✅ Document {current_idx+1} complete ({len(document.content)} chars, {len(document.content.split())} words)")
+        logger.info(f"✅ Document {current_idx+1} complete ({char_count} chars, {word_count} words)")
         logger.info(f"💾 Saved to: {saved_path}")
         
         self._update_status(
             "Ollama",
             f"Stage 5/5: Document {current_idx+1} Complete",
-            f"Wrote {len(document.content.split())} words"
+            f"Wrote {word_count} words"
         )
         
         # Continue to next document (or complete)
@@ -627,8 +664,6 @@ Be comprehensive - use up to 8,000 tokens for this analysis."""
     def _save_session_summary(self, context: ResearchContext, completed_docs: List[Dict]) -> None:
         """Save a summary file with all document information"""
         try:
-            from datetime import datetime
-            
             # Build summary content
             summary_lines = [
                 f"# Research Session Summary",
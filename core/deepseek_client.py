@@ -1,164 +1,261 @@
 import requests
+import io
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import random
+import re
+import string
+import threading
+import time
+import tracemalloc
+import atexit
+import concurrent.futures
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config.settings import Config
-from core.models import LLMMessage, LLMType
+from core.models import LLMMessage, LLMType, SearchResult
+from core.llm_cache import LLMCache, SemanticCache, cache_key
+from utils.token_counter import count_tokens, truncate_to_tokens
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the stdlib encoder
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
 
-class DeepSeekClient:
-    """Client for interacting with DeepSeek API"""
+def _json_dumps(data: Any) -> bytes:
+    """Serialize a request body to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode("utf-8")
+
+
+def _json_loads(raw: Any) -> Any:
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Leading list markers ("1.", "-", "*", "> ") stripped when scraping items from plain text
+_LIST_PREFIX = re.compile(r'^[\d\.\-\*\+\>\s]*')
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Markdown headings and list items in a prompt template - each asks for one section of output
+_SECTION_RE = re.compile(r'^\s*(?:#{2,}|[-*]|\d+\.)\s', re.MULTILINE)
+
+# First number in a per-criterion quality reply
+_NUMBER_RE = re.compile(r'[-+]?\d*\.\d+|\d+')
+
+
+def _extract_first_json(text: str, expected: type) -> Optional[Any]:
+    """
+    Return the first complete JSON object (expected=dict) or array (expected=list) in text
     
-    def __init__(self):
-        self.api_key = Config.DEEPSEEK_API_KEY
-        self.base_url = Config.DEEPSEEK_BASE_URL
-        self.timeout = Config.REQUEST_TIMEOUT
-        
-        if not self.api_key:
-            raise ValueError("DeepSeek API key not configured")
+    Probes each candidate opening bracket with raw_decode, which stops at the end of
+    the value, so trailing prose or later brackets can't make the match run on.
+    """
+    opener = "{" if expected is dict else "["
+    i = text.find(opener)
+    while i != -1:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(text, i)
+            if isinstance(value, expected):
+                return value
+        except ValueError:
+            pass
+        i = text.find(opener, i + 1)
+    return None
+
+
+class _JsonCloseScanner:
+    """
+    Incremental bracket counter over streamed text
     
-    def _make_request(self, endpoint: str, data: Dict[str, Any], retry_count: int = 3) -> Dict[str, Any]:
-        """Make API request to DeepSeek with retry logic"""
-        url = f"{self.base_url}/{endpoint}"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        last_error = None
-        for attempt in range(retry_count):
-            try:
-                logger.info(f"DeepSeek API request attempt {attempt + 1}/{retry_count}")
-                response = requests.post(
-                    url,
-                    headers=headers,
-                    json=data,
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-                return response.json()
-            except requests.exceptions.Timeout as e:
-                last_error = e
-                logger.warning(f"DeepSeek API timeout on attempt {attempt + 1}/{retry_count}: {e}")
-                if attempt < retry_count - 1:
-                    logger.info(f"Retrying in 5 seconds...")
-                    import time
-                    time.sleep(5)
-            except requests.exceptions.RequestException as e:
-                last_error = e
-                logger.error(f"DeepSeek API request failed on attempt {attempt + 1}/{retry_count}: {e}")
-                # Don't retry on non-timeout errors (like 4xx status codes)
-                if attempt < retry_count - 1 and (isinstance(e, requests.exceptions.ConnectionError) or 
-                                                   (hasattr(e.response, 'status_code') and e.response.status_code >= 500)):
-                    logger.info(f"Retrying in 5 seconds...")
-                    import time
-                    time.sleep(5)
-                else:
-                    raise
-        
-        logger.error(f"DeepSeek API request failed after {retry_count} attempts")
-        raise last_error
+    feed() returns True whenever a top-level object (expected=dict) or array
+    (expected=list) has just closed, so the caller can try parsing what it has so far.
+    Brackets inside JSON strings are ignored.
+    """
     
-    def generate_response(self, 
-                         prompt: str, 
-                         context: Optional[str] = None,
-                         temperature: float = None,
-                         max_tokens: int = None) -> LLMMessage:
-        """Generate a response from DeepSeek"""
-        
-        # Use config defaults if not specified
-        if temperature is None:
-            temperature = Config.DEEPSEEK_DEFAULT_TEMPERATURE
-        if max_tokens is None:
-            max_tokens = Config.DEEPSEEK_DEFAULT_MAX_TOKENS
-        
-        # Build the messages array
-        messages = []
-        
-        if context:
-            messages.append({
-                "role": "system",
-                "content": (
-                    f"You are an expert AI researcher, senior software architect, and implementation specialist. Use the following research context to inform your analysis:\n\n{context}\n\n"
-                    "When answering, provide COMPREHENSIVE IMPLEMENTATION GUIDANCE:\n"
-                    "1) Reference specific search results or key insights provided in context and cite sources in [Source: URL] format.\n"
-                    "2) Provide BOTH architecture AND detailed implementation guidance: system design, code examples, configuration files, and setup procedures.\n"
-                    "3) Include DETAILED CODE EXAMPLES with complete implementations - not just pseudocode or snippets. Show actual working code.\n"
-                    "4) When making recommendations, explain trade-offs, design decisions, WHY certain approaches are chosen, AND HOW to implement them.\n"
-                    "5) Include step-by-step implementation procedures, configuration examples, and troubleshooting guidance.\n"
-                    "6) Provide PRODUCTION-READY implementation guidance - what to build, why, how to build it, and how to deploy it.\n"
-                    "7) Include complete file structures, configuration files, dependency lists, and deployment scripts.\n"
-                    "8) Add code comments, error handling examples, and best practices for each implementation.\n"
-                    "Provide comprehensive documentation suitable for developers to take a project from start to finish."
-                )
-            })
-        else:
-            messages.append({
-                "role": "system",
-                "content": "You are an expert AI researcher, software architect, and implementation specialist. Provide detailed architectural analysis, design decisions, AND comprehensive implementation guidance with complete code examples, configurations, and step-by-step procedures."
-            })
-        
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
-        
-        # Add explicit instruction to cite sources from the context when referencing research
-        citation_instruction = "\n\nWhen referencing research or facts, cite the source using the format: [Source: URL]. If multiple sources support a claim, list them."
-        if context:
-            messages[0]['content'] += citation_instruction
+    def __init__(self, expected: type):
+        self.opener = "{" if expected is dict else "["
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk: str) -> bool:
+        closed = False
+        for ch in chunk:
+            if self.depth == 0:
+                if ch == self.opener:
+                    self.depth = 1
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                closed = closed or self.depth == 0
+        return closed
+
+
+class _JitteredRetry(Retry):
+    """urllib3 Retry whose exponential backoff is spread by +/-25% jitter"""
+    
+    MAX_BACKOFF_SECONDS = 60.0
+    
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        # Jitter keeps concurrent document requests from retrying in lockstep
+        return min(self.MAX_BACKOFF_SECONDS, backoff * random.uniform(0.75, 1.25))
 
-        request_data = {
-            "model": Config.DEEPSEEK_MODEL,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "stream": False
-        }
-        
-        try:
-            response_data = self._make_request("chat/completions", request_data)
-            
-            # Extract the response content
-            content = response_data["choices"][0]["message"]["content"]
-            # Log prompt and response sizes for debugging
-            try:
-                prompt_len = len(json.dumps(request_data))
-                resp_len = len(content)
-                logger.info(f"DeepSeek request size: {prompt_len} bytes, response size: {resp_len} chars, max_tokens: {max_tokens}")
-            except Exception:
-                pass
-            
-            # Create LLM message
-            message = LLMMessage(
-                llm_type=LLMType.DEEPSEEK,
-                content=content,
-                confidence_score=0.8  # Default confidence
-            )
-            
-            logger.info(f"DeepSeek response generated: {len(content)} characters")
-            return message
-            
-        except Exception as e:
-            logger.error(f"Failed to generate DeepSeek response: {e}")
-            # Return a fallback message
-            return LLMMessage(
-                llm_type=LLMType.DEEPSEEK,
-                content=f"I encountered an error while processing your request: {str(e)}. Please try again.",
-                confidence_score=0.0
-            )
+
+class _CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without contacting the API while the circuit breaker is open"""
+
+
+class _CircuitBreaker:
+    """
+    Process-wide fail-fast switch for provider outages
     
-    def analyze_research_context(self, 
-                               user_prompt: str,
-                               research_context: str) -> LLMMessage:
-        """Analyze research context and provide comprehensive implementation foundation"""
-        
-        prompt = f"""Hi! I'm DeepSeek. I need to create a comprehensive architectural design document and implementation plan for: {user_prompt}
+    Opens after `threshold` consecutive outage failures (connection errors, timeouts,
+    429/5xx after the adapter's retries); while open, requests fail immediately. Once
+    the cooldown passes one probe request is let through, and its outcome closes or
+    re-opens the circuit.
+    """
+    
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def before_request(self):
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            if self._failures < self.threshold:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                raise _CircuitOpenError(
+                    f"DeepSeek circuit open after {self._failures} consecutive failures, "
+                    f"next attempt in {remaining:.0f}s"
+                )
+            # This request is the probe - everyone else waits out another cooldown
+            self._opened_at = time.monotonic()
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+    
+    def record_failure(self, error: Exception):
+        response = getattr(error, "response", None)
+        if response is not None and response.status_code < 500 and response.status_code != 429:
+            return  # A rejected request (bad payload, auth) says nothing about provider health
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                if self._failures == self.threshold:
+                    logger.warning(f"DeepSeek circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+
+
+# Smallest completion budget worth sending a request for
+_MIN_OUTPUT_TOKENS = 512
+
+_ERROR_TEMPLATE = "I encountered an error while processing your request: {err}. Please try again."
+
+
+def _response_message(content: str) -> LLMMessage:
+    """Wrap a generated response (default confidence for an unvalidated answer)"""
+    return LLMMessage(llm_type=LLMType.DEEPSEEK, content=content, confidence_score=0.8)
+
+
+def _error_message(error: Exception) -> LLMMessage:
+    """Fallback message returned instead of raising when a request fails"""
+    return LLMMessage(llm_type=LLMType.DEEPSEEK, content=_ERROR_TEMPLATE.format(err=error), confidence_score=0.0)
+
+
+# Explicit instruction to cite sources from the context when referencing research
+_CITATION_INSTRUCTION = (
+    "\n\nWhen referencing research or facts, cite the source using the format: [Source: URL]. "
+    "If multiple sources support a claim, list them."
+)
+
+# Kept byte-identical across calls (the research context goes in its own message after it)
+# so the provider's prompt-prefix cache can reuse the prefill of this block.
+_SYSTEM_PROMPT_WITH_CONTEXT = (
+    "You are an expert AI researcher, senior software architect, and implementation specialist. Use the research context provided in the next message to inform your analysis.\n\n"
+    "When answering, provide COMPREHENSIVE IMPLEMENTATION GUIDANCE:\n"
+    "1) Reference specific search results or key insights provided in context and cite sources in [Source: URL] format.\n"
+    "2) Provide BOTH architecture AND detailed implementation guidance: system design, code examples, configuration files, and setup procedures.\n"
+    "3) Include DETAILED CODE EXAMPLES with complete implementations - not just pseudocode or snippets. Show actual working code.\n"
+    "4) When making recommendations, explain trade-offs, design decisions, WHY certain approaches are chosen, AND HOW to implement them.\n"
+    "5) Include step-by-step implementation procedures, configuration examples, and troubleshooting guidance.\n"
+    "6) Provide PRODUCTION-READY implementation guidance - what to build, why, how to build it, and how to deploy it.\n"
+    "7) Include complete file structures, configuration files, dependency lists, and deployment scripts.\n"
+    "8) Add code comments, error handling examples, and best practices for each implementation.\n"
+    "Provide comprehensive documentation suitable for developers to take a project from start to finish."
+    + _CITATION_INSTRUCTION
+)
+
+_CONTEXT_MESSAGE_TEMPLATE = "Research context:\n\n{context}"
+
+# Stands in for the research context in prompt bodies whose request already carries the
+# context message - the same text is never sent twice in one request
+_CONTEXT_REFERENCE = "(see the research context message above)"
+
+_SYSTEM_PROMPT_NO_CONTEXT = (
+    "You are an expert AI researcher, software architect, and implementation specialist. Provide detailed architectural analysis, design decisions, "
+    "AND comprehensive implementation guidance with complete code examples, configurations, and step-by-step procedures."
+    + _CITATION_INSTRUCTION
+)
+
+# string.Template so the research text and discussion are substituted without format-spec parsing
+_ARCHITECTURE_DOC_PROMPT = string.Template("""Create a COMPREHENSIVE, PRODUCTION-READY System Architecture & Implementation Guide.
+
+PROJECT: $user_prompt
+
+Cover complete development lifecycle:
+- Requirements & Planning
+- Environment Setup
+- Database Design
+- Backend Implementation
+- Frontend Implementation
+- Testing Strategy
+- Security Implementation
+- DevOps & Deployment
+- Operations & Maintenance
+- Documentation
+
+RESEARCH CONTEXT:
+$research_context
+
+TECHNICAL DISCUSSION:
+$conversation_summary
+
+Generate detailed outline covering all phases with complete implementations, configurations, and code examples.""")
+
+# Static prompt bodies built once at import; only the request-specific fields are substituted per call
+_ANALYSIS_PROMPT = string.Template("""Hi! I'm DeepSeek. I need to create a comprehensive architectural design document and implementation plan for: $user_prompt
 
 Research findings:
-{research_context}
+$research_context
 
 IMPORTANT: Focus on ARCHITECTURE, DESIGN, and PLANNING - not detailed code implementation. Provide comprehensive documentation that explains WHAT to build and WHY, with minimal code examples.
 
@@ -201,24 +298,16 @@ IMPORTANT: Focus on ARCHITECTURE, DESIGN, and PLANNING - not detailed code imple
 
 Ollama, I want to make sure this architectural plan covers everything needed. What are your thoughts on the design decisions and implementation approach?
 
-FOCUS ON PLANNING DOCUMENTATION - save detailed code for the actual development phase."""
-        
-        return self.generate_response(prompt, research_context, max_tokens=Config.DEEPSEEK_STAGE5_MAX_TOKENS)
-    
-    def refine_analysis(self,
-                       user_prompt: str,
-                       research_context: str,
-                       ollama_analysis: str) -> LLMMessage:
-        """Refine analysis based on Ollama's input"""
-        
-        prompt = f"""
+FOCUS ON PLANNING DOCUMENTATION - save detailed code for the actual development phase.""")
+
+_REFINE_PROMPT = string.Template("""
         Based on the user's prompt, research context, and Ollama's technical analysis, please refine your recommendations:
 
-        USER PROMPT: {user_prompt}
+        USER PROMPT: $user_prompt
 
-        RESEARCH CONTEXT: {research_context}
+        RESEARCH CONTEXT: $research_context
 
-        OLLAMA'S TECHNICAL ANALYSIS: {ollama_analysis}
+        OLLAMA'S TECHNICAL ANALYSIS: $ollama_analysis
 
         Please:
         1. Address any technical concerns raised by Ollama
@@ -227,22 +316,12 @@ FOCUS ON PLANNING DOCUMENTATION - save detailed code for the actual development
         4. Propose a refined architecture and technology stack
 
         Focus on building consensus and addressing technical constraints.
-        """
-        
-        return self.generate_response(prompt, research_context, max_tokens=Config.DEEPSEEK_STAGE2_MAX_TOKENS)
-    
-    def continue_discussion(self, user_prompt: str, research_context: str, ollama_response: str) -> LLMMessage:
-        """Continue the discussion based on Ollama's latest points"""
-        logger.info("DeepSeek continuing discussion")
-        
-        # Truncate long responses for context
-        if len(ollama_response) > 1000:
-            ollama_response = ollama_response[:1000] + "... [truncated for discussion]"
-        
-        prompt = f"""You are DeepSeek having a conversation with Ollama about: {user_prompt}
+        """)
+
+_CONTINUE_DISCUSSION_PROMPT = string.Template("""You are DeepSeek having a conversation with Ollama about: $user_prompt
 
 Ollama just said:
-{ollama_response}
+$ollama_response
 
 Continue this technical discussion by exploring ONE of these design areas in depth:
 
@@ -271,38 +350,25 @@ Continue this technical discussion by exploring ONE of these design areas in dep
 
 Pick ONE area that needs more discussion based on Ollama's response. Be specific and technical, but keep it conversational (3-4 paragraphs).
 
-Research context: {research_context[:500]}...
-"""
-        
-        return self.generate_response(prompt, research_context, max_tokens=Config.DEEPSEEK_STAGE5_MAX_TOKENS)
-    
-    # ==================== NEW: OPTIMIZED DOCUMENT WORKFLOW ====================
-    
-    def create_document_outline(self, 
-                               doc_number: int,
-                               doc_type: str,
-                               user_prompt: str,
-                               research_context: str,
-                               conversation_summary: str) -> LLMMessage:
-        """Create COMPREHENSIVE outline for PRODUCTION-READY documentation (8K detailed outline)"""
-        
-        # Build a clean prompt without embedded code to avoid Python syntax issues
-        prompt = f"""Create a MASSIVELY DETAILED OUTLINE for Document #{doc_number}: {doc_type}
+Research context: $research_context
+""")
+
+_OUTLINE_PROMPT = string.Template("""Create a MASSIVELY DETAILED OUTLINE for Document #$doc_number: $doc_type
 
-PROJECT: {user_prompt}
+PROJECT: $user_prompt
 
 RESEARCH CONTEXT (100+ sources, 128K tokens analyzed):
-{research_context[:15000]}
+$research_context
 
 TECHNICAL DISCUSSION:
-{conversation_summary[:8000]}
+$conversation_summary
 
 
 YOUR MISSION: Create a COMPREHENSIVE, PRODUCTION-LEVEL outline that will guide another LLM to write a 20,000-30,000+ word, ENTERPRISE-GRADE implementation guide covering the COMPLETE SOFTWARE DEVELOPMENT LIFECYCLE.
 
 OUTLINE STRUCTURE (Use ALL 8,000 tokens):
 
-# {doc_type}
+# $doc_type
 
 ## DOCUMENT OVERVIEW
 **Scope**: Complete production system development from requirements to operations
@@ -639,22 +705,41 @@ Each model should be 100-400 lines, fully implemented
 - Operational procedures included
 - Comprehensive troubleshooting
 
-🚨 CRITICAL: This outline must be SO DETAILED that an LLM can write a 20,000-30,000 word production-ready guide by following it. Include specific facts, exact code requirements, complete file lists, and comprehensive coverage of the entire development lifecycle from day 1 to production operations."""
+🚨 CRITICAL: This outline must be SO DETAILED that an LLM can write a 20,000-30,000 word production-ready guide by following it. Include specific facts, exact code requirements, complete file lists, and comprehensive coverage of the entire development lifecycle from day 1 to production operations.""")
+
+
+def _split_outline_phases(template_text: str) -> Tuple[str, str, List[str]]:
+    """Split the outline prompt into (instructions, document header, per-phase sections)"""
+    header_start = template_text.index("\n# $doc_type\n")
+    phases_start = template_text.index("\n## PHASE 1:")
+    phases_end = template_text.index("\n## 📊 OUTLINE METADATA")
+    instructions = template_text[:header_start].replace("OUTLINE STRUCTURE (Use ALL 8,000 tokens):", "").rstrip()
+    header = template_text[header_start:phases_start].strip()
+    phases = ["## PHASE" + section.rstrip() for section in template_text[phases_start:phases_end].split("\n## PHASE")[1:]]
+    return instructions, header, phases
+
+
+_OUTLINE_INSTRUCTIONS, _OUTLINE_HEADER, _OUTLINE_PHASES = _split_outline_phases(_OUTLINE_PROMPT.template)
+_OUTLINE_HEADER = string.Template(_OUTLINE_HEADER)
+
+# One request per phase: the shared instructions and research prefix, then only that phase's section
+_OUTLINE_PHASE_PROMPTS = [
+    string.Template(
+        _OUTLINE_INSTRUCTIONS
+        + "\n\nTHIS REQUEST: Outline ONLY the phase below. The document title, overview and the other "
+        "phases are outlined in separate requests and joined with yours, so start directly with the "
+        "phase heading and do not repeat them.\n\n"
+        + phase
+    )
+    for phase in _OUTLINE_PHASES
+]
 
-        return self.generate_response(prompt, research_context, temperature=0.3, max_tokens=Config.DEEPSEEK_OUTLINE_MAX_TOKENS)
-    
-    def create_research_summary(self,
-                               doc_type: str,
-                               research_context: str,
-                               user_prompt: str) -> LLMMessage:
-        """Compress 128K research into 2-3K summary relevant to specific document"""
-        
-        prompt = f"""From the extensive research below, extract ONLY information relevant to: {doc_type}
+_RESEARCH_SUMMARY_PROMPT = string.Template("""From the extensive research below, extract ONLY information relevant to: $doc_type
 
-PROJECT: {user_prompt}
+PROJECT: $user_prompt
 
 FULL RESEARCH (100+ sources):
-{research_context[:20000]}
+$research_context
 
 YOUR TASK: Create a 2,000-3,000 token summary containing ONLY what's needed for writing this specific document type.
 
@@ -690,29 +775,20 @@ OUTPUT FORMAT:
 - Practice 1: [description]
 - Practice 2: [description]
 
-This summary will be given to Ollama (24K context) for document writing."""
+This summary will be given to Ollama (24K context) for document writing.""")
 
-        return self.generate_response(prompt, research_context, temperature=0.2, max_tokens=3000)
-    
-    def review_document_accuracy(self,
-                                document_content: str,
-                                original_outline: str,
-                                research_context: str,
-                                doc_title: str) -> LLMMessage:
-        """Review Ollama's document against research for technical accuracy"""
-        
-        prompt = f"""Review this implementation guide for TECHNICAL ACCURACY and COMPLETENESS.
+_REVIEW_PROMPT = string.Template("""Review this implementation guide for TECHNICAL ACCURACY and COMPLETENESS.
 
-DOCUMENT: {doc_title}
+DOCUMENT: $doc_title
 
 ORIGINAL OUTLINE:
-{original_outline[:3000]}
+$original_outline
 
 DOCUMENT CONTENT (written by Ollama):
-{document_content[:6000]}
+$document_content
 
 RESEARCH CONTEXT (for verification):
-{research_context[:10000]}
+$research_context
 
 YOUR REVIEW CHECKLIST:
 1. **Outline Adherence**: Did it cover all sections from outline?
@@ -729,142 +805,96 @@ PROVIDE:
 4. **Citation Issues**: Missing or incorrect source citations
 5. **Specific Improvements**: 3-5 concrete additions/fixes needed
 
-Keep response under 5,000 tokens. Be specific and actionable."""
+Keep response under 5,000 tokens. Be specific and actionable.""")
 
-        return self.generate_response(prompt, research_context, temperature=0.3, max_tokens=5000)
-    
-    def generate_multiple_documents(self,
-                                  user_prompt: str,
-                                  research_context: str,
-                                  conversation_summary: str) -> List[Dict[str, str]]:
-        """Generate multiple specialized documents for comprehensive implementation"""
-        
-        documents = []
-        
-        # MASSIVE increase in max tokens for COMPREHENSIVE, PRODUCTION-READY documentation
-        # These documents must be complete enough to build entire systems from scratch
-        doc_max_tokens = Config.DEEPSEEK_COMPREHENSIVE_DOC_MAX_TOKENS  # 64K tokens per document
-        logger.info(f"Generating comprehensive production-ready documents with {doc_max_tokens} max tokens each")
-        
-        try:
-            # Document 1: System Architecture & Implementation Guide
-            logger.info("Generating Document 1: System Architecture & Implementation")
-            arch_prompt = """Create a COMPREHENSIVE, PRODUCTION-READY System Architecture & Implementation Guide.
+# Structured-output tasks: the fixed instructions are the system message (identical on every
+# call, so the provider can cache their prefill) and only the request fields go in the user message
+_RESEARCH_PLAN_SYSTEM = """You are a research expert. For the project request in the user message, generate 8-12 comprehensive search queries that would gather ALL information needed for complete implementation from start to finish. Focus on:
 
-PROJECT: {user_prompt}
+**CORE IMPLEMENTATION RESEARCH:**
+1. Technology stack and framework recommendations with specific versions
+2. System architecture patterns and design principles
+3. Database design and data modeling best practices
+4. API design patterns and implementation examples
 
-Cover complete development lifecycle:
-- Requirements & Planning
-- Environment Setup
-- Database Design
-- Backend Implementation
-- Frontend Implementation
-- Testing Strategy
-- Security Implementation
-- DevOps & Deployment
-- Operations & Maintenance
-- Documentation
+**DETAILED IMPLEMENTATION GUIDANCE:**
+5. Step-by-step implementation tutorials and code examples
+6. Production deployment strategies and infrastructure setup
+7. Security implementation and authentication patterns
+8. Testing strategies and quality assurance approaches
 
-RESEARCH CONTEXT:
-{research_context}
+**OPERATIONAL & MAINTENANCE RESEARCH:**
+9. Performance optimization and monitoring solutions
+10. Error handling and fault tolerance patterns
+11. Scalability considerations and load balancing
+12. DevOps practices and CI/CD pipeline setup
 
-TECHNICAL DISCUSSION:
-{conversation_summary}
+**PRACTICAL CONSIDERATIONS:**
+13. Common pitfalls and troubleshooting guides
+14. Resource requirements and timeline estimation
+15. Team structure and development workflow
+16. Documentation and maintenance strategies
 
-Generate detailed outline covering all phases with complete implementations, configurations, and code examples.""".format(
-                user_prompt=user_prompt,
-                research_context=research_context[:15000],
-                conversation_summary=conversation_summary[:8000]
-            )
+Return your response as a JSON object with this structure:
+{
+    "queries": [
+        "specific technical implementation query 1",
+        "specific deployment and setup query 2",
+        "specific architecture pattern query 3",
+        ...
+    ],
+    "research_focus": "comprehensive implementation and deployment guidance"
+}
 
-            arch_doc = self.generate_response(
-                arch_prompt,
-                research_context,
-                temperature=0.3,
-                max_tokens=doc_max_tokens
-            )
+Make each query specific, technical, and focused on actionable implementation details. Include queries for setup guides, code examples, production deployment, and operational procedures."""
 
-            documents.append({
-                "title": "System Architecture & Implementation Guide",
-                "filename": "01_system_architecture.md",
-                "content": arch_doc.content,
-                "category": "architecture"
-            })
-            logger.info(f"Document 1 generated successfully")
+_RESEARCH_PLAN_REQUEST = string.Template('Project request: "$user_prompt"')
 
-        except Exception as e:
-            logger.error(f"Failed to generate documents: {e}")
-            documents.append({
-                "title": "System Architecture & Implementation Guide",
-                "filename": "01_system_architecture.md",
-                "content": f"# Error\n\nFailed to generate: {str(e)}",
-                "category": "architecture"
-            })
+_RESEARCH_INSIGHTS_SYSTEM = """Analyze the search results in the user message for the request given there.
 
-        return documents
+Extract 5-8 key insights that would be most valuable for understanding and implementing this request. Focus on:
 
-    def generate_final_plan(self,
-                          user_prompt: str,
-                          research_context: str,
-                          conversation_summary: str) -> LLMMessage:
-        """Generate final development plan - now creates multiple documents"""
-        
-        # Check if we have enough content for multiple documents
-        total_content_length = len(research_context) + len(conversation_summary)
-        
-        if total_content_length > 15000:  # Substantial content - create multiple documents
-            logger.info("Generating multiple specialized documents due to comprehensive content")
-            
-            # Generate multiple documents
-            documents = self.generate_multiple_documents(user_prompt, research_context, conversation_summary)
-            
-            # Create a summary document that references all the specialized documents
-            summary_content = f"""# Complete Implementation Documentation Suite
+1. Technical architecture patterns
+2. Implementation strategies  
+3. Tool and framework recommendations
+4. Performance considerations
+5. Common challenges and solutions
+6. Best practices and patterns
 
-Generated {len(documents)} comprehensive documents for: **{user_prompt}**
+Return insights as a JSON array:
+[
+    {
+        "insight": "specific technical insight",
+        "source": "which search result(s) this came from",
+        "relevance": "why this matters for the request"
+    },
+    ...
+]
 
-## Document Overview:
+Make insights actionable and technically specific."""
 
-"""
-            for i, doc in enumerate(documents, 1):
-                summary_content += f"### {i}. {doc['title']} ({doc['filename']})\n"
-                summary_content += f"**Category:** {doc['category'].title()}\n"
-                summary_content += f"**Content Length:** {len(doc['content']):,} characters\n\n"
+_RESEARCH_INSIGHTS_REQUEST = string.Template('''Request: "$user_prompt"
 
-            summary_content += """## Implementation Workflow:
+SEARCH RESULTS:
+$results_summary''')
 
-1. **Start with System Architecture** - Review the technical specifications and understand the overall system design
-2. **Follow the Implementation Guide** - Use the step-by-step development plan and setup instructions  
-3. **Implement Security & Testing** - Follow the security guidelines and set up comprehensive testing
-4. **Use API Documentation** - Integrate with external services and implement API endpoints
+_QUALITY_SYSTEM = """Evaluate the content in the user message against the single quality criterion named at its end.
 
-Each document is designed to be comprehensive and actionable. Download each document for detailed implementation guidance.
+Reply with the score from 0.0 to 1.0 alone on the first line, then at most three sentences of
+specific feedback: strengths, weaknesses and one suggestion for improvement."""
 
-## Next Steps:
-1. Download all documents
-2. Review the system architecture first
-3. Set up your development environment using the implementation guide
-4. Follow the phased development approach outlined in the documents
+# Content before the criterion so the per-criterion requests share everything but their last line
+_QUALITY_REQUEST = string.Template("""CONTENT TO EVALUATE:
+$content
 
-*These documents provide everything needed to build a production-ready application from start to finish.*"""
+QUALITY CRITERION: $criterion""")
 
-            # Store the documents for download (this will be handled by the file manager)
-            return LLMMessage(
-                llm_type=LLMType.DEEPSEEK,
-                content=summary_content,
-                confidence_score=0.9,
-                metadata={"documents": documents, "multi_document": True}
-            )
-        
-        else:
-            # Fall back to single comprehensive document for smaller projects
-            logger.info("Generating single comprehensive document due to limited content")
-            
-            prompt = f"""
-            Create a COMPREHENSIVE, PRODUCTION-READY architectural design document and development plan for: {user_prompt}
+# Final plan for projects below DEEPSEEK_MULTI_DOC_MIN_TOKENS (one document instead of a suite)
+_SINGLE_DOCUMENT_PROMPT = string.Template("""
+            Create a COMPREHENSIVE, PRODUCTION-READY architectural design document and development plan for: $user_prompt
 
-            RESEARCH FINDINGS: {research_context}
-            TECHNICAL DISCUSSION: {conversation_summary}
+            RESEARCH FINDINGS: $research_context
+            TECHNICAL DISCUSSION: $conversation_summary
 
             Generate a complete planning and design document covering:
             - System architecture and design philosophy (diagrams and explanations, NOT code)
@@ -877,220 +907,882 @@ Each document is designed to be comprehensive and actionable. Download each docu
 
             IMPORTANT: Focus on WHAT to build and WHY. Include minimal code examples ONLY for critical concepts.
             This is planning documentation, not a code repository. Make it comprehensive enough for a team to understand 
-            the architecture and plan development, but save detailed implementation for the development phase."""
+            the architecture and plan development, but save detailed implementation for the development phase.""")
+
+# Summary message for a multi-document final plan: header, one line per document, footer
+_SUITE_SUMMARY_HEADER = """# Complete Implementation Documentation Suite
+
+Generated {count} comprehensive documents for: **{user_prompt}**
+
+## Document Overview:
+
+"""
+
+_SUITE_SUMMARY_DOC_LINE = (
+    "### {number}. {title} ({filename})\n"
+    "**Category:** {category}\n"
+    "**Content Length:** {size:,} characters\n\n"
+)
+
+_SUITE_SUMMARY_FOOTER = """## Implementation Workflow:
+
+1. **Start with System Architecture** - Review the technical specifications and understand the overall system design
+2. **Follow the Implementation Guide** - Use the step-by-step development plan and setup instructions  
+3. **Implement Security & Testing** - Follow the security guidelines and set up comprehensive testing
+4. **Use API Documentation** - Integrate with external services and implement API endpoints
+
+Each document is designed to be comprehensive and actionable. Download each document for detailed implementation guidance.
+
+## Next Steps:
+1. Download all documents
+2. Review the system architecture first
+3. Set up your development environment using the implementation guide
+4. Follow the phased development approach outlined in the documents
+
+*These documents provide everything needed to build a production-ready application from start to finish.*"""
+
+# Documents produced by generate_multiple_documents (generated concurrently).
+_DOCUMENT_SPECS = [
+    {
+        "title": "System Architecture & Implementation Guide",
+        "filename": "01_system_architecture.md",
+        "category": "architecture",
+        "prompt": _ARCHITECTURE_DOC_PROMPT
+    },
+]
+
+
+class DeepSeekClient:
+    """Client for interacting with DeepSeek API"""
+    
+    _shared_lock = threading.Lock()
+    _shared_session: Optional[requests.Session] = None
+    _shared_cache: Optional[LLMCache] = None
+    _shared_log_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+    _shared_semantic: Optional[SemanticCache] = None
+    _breaker = _CircuitBreaker(Config.DEEPSEEK_CIRCUIT_BREAKER_THRESHOLD, Config.DEEPSEEK_CIRCUIT_BREAKER_COOLDOWN)
+    
+    def __init__(self):
+        self.api_key = Config.DEEPSEEK_API_KEY
+        self.base_url = Config.DEEPSEEK_BASE_URL
+        # (connect, read) - a dead host fails in seconds while long generations keep the full read budget
+        self.timeout = (Config.CONNECT_TIMEOUT, Config.REQUEST_TIMEOUT)
+        
+        if not self.api_key:
+            raise ValueError("DeepSeek API key not configured")
+        
+        # Every orchestrator builds its own client; the connection pool, response cache and
+        # log worker are process-wide so new research sessions reuse warm connections and cached answers.
+        self._session, self._cache, self._log_pool = self._shared_resources(self.api_key)
+        self._semantic_cache = DeepSeekClient._shared_semantic
+        self._http_version_logged = False
+        
+        # Fields shared by every chat/completions body; each call merges in its own messages
+        self._base_request = {"model": Config.DEEPSEEK_MODEL}
+        # Endpoint URLs are fixed for the client's lifetime; headers already live on the session
+        self._endpoints = {"chat/completions": f"{self.base_url}/chat/completions"}
+    
+    def _endpoint_url(self, endpoint: str) -> str:
+        url = self._endpoints.get(endpoint)
+        if url is None:
+            url = self._endpoints[endpoint] = f"{self.base_url}/{endpoint}"
+        return url
+    
+    @classmethod
+    def _shared_resources(cls, api_key: str):
+        """Create (once) the pooled session, response cache and log worker shared by all clients"""
+        with cls._shared_lock:
+            if cls._shared_session is None:
+                # Persistent session so every call reuses the same keep-alive TLS connection.
+                # Retries (exponential backoff + jitter, Retry-After honoured) are handled by the adapter.
+                retry = _JitteredRetry(
+                    total=3,
+                    backoff_factor=1.5,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["POST"],
+                    respect_retry_after_header=True,
+                    raise_on_status=False
+                )
+                # Size the keep-alive pool to the document fan-out so concurrent requests never open
+                # throwaway connections; pool_block makes any overflow wait for a free socket instead.
+                pool_size = max(10, Config.DEEPSEEK_MAX_CONCURRENT_REQUESTS)
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=pool_size, pool_block=True)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                })
+                session.headers["Connection"] = "keep-alive"
+                cls._shared_session = session
+                
+                cls._shared_cache = LLMCache(max_entries=Config.LLM_CACHE_MAX_ENTRIES, ttl=Config.LLM_CACHE_TTL,
+                                             directory=Config.LLM_CACHE_DIR or None)
+                if Config.LLM_SEMANTIC_CACHE_ENABLED:
+                    if not Config.LLM_DETERMINISTIC:
+                        # Paraphrase matching is limited to temperature-0 requests, which only this mode sends
+                        logger.warning("LLM_SEMANTIC_CACHE_ENABLED has no effect without LLM_DETERMINISTIC")
+                    elif SemanticCache.available():
+                        cls._shared_semantic = SemanticCache(Config.LLM_SEMANTIC_CACHE_MODEL,
+                                                             Config.LLM_SEMANTIC_CACHE_THRESHOLD,
+                                                             Config.LLM_CACHE_MAX_ENTRIES)
+                    else:
+                        logger.warning("LLM_SEMANTIC_CACHE_ENABLED is set but sentence-transformers is not installed")
+                
+                # Single worker keeps stats lines in call order; error logging stays synchronous
+                cls._shared_log_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="ds-log")
+            return cls._shared_session, cls._shared_cache, cls._shared_log_pool
+    
+    def _log_http_version(self, response: requests.Response):
+        """Log the negotiated HTTP version once per client (debug aid for connection reuse)"""
+        if self._http_version_logged:
+            return
+        self._http_version_logged = True
+        version = getattr(response.raw, "version", None)
+        if version:
+            logger.debug(f"DeepSeek connection using HTTP/{version // 10}.{version % 10}")
+    
+    def _cache_key(self, data: Dict[str, Any]) -> Optional[str]:
+        """Cache key for a request, or None if the request should not be cached"""
+        # Identical low-temperature requests produce the same output - serve them from cache
+        if not Config.LLM_CACHE_ENABLED or data.get("temperature", 0) > Config.LLM_CACHE_MAX_TEMPERATURE:
+            return None
+        return cache_key(data)
+    
+    def _semantic_scope(self, data: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """(scope, prompt) for the semantic cache - deterministic (temperature 0) requests only"""
+        if self._semantic_cache is None or data.get("temperature", 0) != 0:
+            return None
+        messages = data["messages"]
+        scope = cache_key({**data, "messages": messages[:-1]})
+        return scope, messages[-1]["content"]
+    
+    def _cache_lookup(self, key: Optional[str], data: Dict[str, Any]) -> Optional[Any]:
+        """Exact-match cache first, then the semantic tier for paraphrased prompts"""
+        if not key:
+            return None
+        cached = self._cache.get(key)
+        if cached is None:
+            semantic = self._semantic_scope(data)
+            if semantic:
+                cached = self._semantic_cache.get(*semantic)
+        if cached is not None:
+            logger.info("DeepSeek response served from cache")
+        return cached
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters of the shared response cache (and the semantic tier when enabled)"""
+        stats = {"exact": dict(self._cache.stats)}
+        if self._semantic_cache is not None:
+            stats["semantic"] = dict(self._semantic_cache.stats)
+        return stats
+    
+    def _cache_store(self, key: Optional[str], data: Dict[str, Any], value: Any):
+        if not key:
+            return
+        self._cache.set(key, value)
+        semantic = self._semantic_scope(data)
+        if semantic:
+            self._semantic_cache.set(*semantic, value)
+    
+    def _make_request(self, endpoint: str, data: Dict[str, Any], force_refresh: bool = False) -> Dict[str, Any]:
+        """Make API request to DeepSeek (retries handled by the session adapter)"""
+        url = self._endpoint_url(endpoint)
+        
+        key = self._cache_key(data)
+        if not force_refresh:
+            cached = self._cache_lookup(key, data)
+            if cached is not None:
+                return cached
+        
+        self._breaker.before_request()
+        try:
+            response = self._session.post(url, data=_json_dumps(data), timeout=self.timeout)
+            response.raise_for_status()
+            self._log_http_version(response)
+            response_data = _json_loads(response.content)
+        except requests.exceptions.RequestException as e:
+            self._breaker.record_failure(e)
+            logger.error(f"DeepSeek API request failed: {e}")
+            raise
+        self._breaker.record_success()
+        
+        self._cache_store(key, data, response_data)
+        return response_data
+    
+    def _stream_request(self, endpoint: str, data: Dict[str, Any], force_refresh: bool = False) -> Iterator[str]:
+        """Make a streaming API request to DeepSeek and yield content deltas as they arrive (SSE)"""
+        url = self._endpoint_url(endpoint)
+        
+        key = self._cache_key(data)
+        if not force_refresh:
+            cached = self._cache_lookup(key, data)
+            if cached is not None:
+                yield cached
+                return
+        
+        self._breaker.before_request()
+        try:
+            response = self._session.post(url, data=_json_dumps(data), timeout=self.timeout, stream=True)
+            response.raise_for_status()
+            self._log_http_version(response)
+        except requests.exceptions.RequestException as e:
+            self._breaker.record_failure(e)
+            logger.error(f"DeepSeek streaming request failed: {e}")
+            raise
+        
+        # The breaker only hears about the stream once the body is read - the headers can
+        # arrive and the connection still drop mid-response
+        parts = [] if key else None  # Deltas are only retained when the finished response is going into the cache
+        try:
+            with response:
+                for line in response.iter_lines():
+                    if not line.startswith(b"data: "):
+                        continue
+                    payload = line[6:]
+                    if payload == b"[DONE]":
+                        break
+                    choices = _json_loads(payload).get("choices")
+                    if not choices:
+                        continue
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if parts is not None:
+                            parts.append(delta)
+                        yield delta
+        except GeneratorExit:
+            self._breaker.record_success()  # The caller stopped reading - the server was fine
+            raise
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._breaker.record_failure(e)
+            logger.error(f"DeepSeek stream interrupted: {e}")
+            raise
+        self._breaker.record_success()
+        
+        # Only a fully consumed stream is cached
+        if key:
+            self._cache_store(key, data, "".join(parts))
+    
+    def _prepare_context(self, text: Optional[str], max_chars: Optional[int] = None,
+                         suffix: str = "\n... [truncated]") -> Optional[str]:
+        """Cap a context string to a character budget before it is embedded in a prompt"""
+        if max_chars is None:
+            max_chars = Config.DEEPSEEK_MAX_CONTEXT_CHARS
+        if not text or len(text) <= max_chars:
+            return text
+        return text[:max_chars] + suffix
+    
+    def _smart_truncate(self, text: Optional[str], max_tokens: int,
+                        suffix: str = "... [truncated]") -> Optional[str]:
+        """Cap a prompt fragment to a token budget (rather than a character count)"""
+        return truncate_to_tokens(text, max_tokens, suffix)
+    
+    def _build_request(self,
+                       prompt: str,
+                       context: Optional[str],
+                       temperature: Optional[float],
+                       max_tokens: Optional[int],
+                       stream: bool = False,
+                       system: Optional[str] = None) -> Dict[str, Any]:
+        """Build the chat/completions request body"""
+        
+        # Use config defaults if not specified
+        if temperature is None:
+            temperature = Config.DEEPSEEK_DEFAULT_TEMPERATURE
+        if Config.LLM_DETERMINISTIC:
+            temperature = 0  # Reproducible output - and every request becomes cacheable
+        if max_tokens is None:
+            max_tokens = Config.DEEPSEEK_DEFAULT_MAX_TOKENS
+        
+        # Build the messages array
+        context = self._prepare_context(context)
+        if context:
+            messages = [
+                {"role": "system", "content": system or _SYSTEM_PROMPT_WITH_CONTEXT},
+                {"role": "system", "content": _CONTEXT_MESSAGE_TEMPLATE.format(context=context)},
+                {"role": "user", "content": prompt}
+            ]
+        else:
+            messages = [
+                {"role": "system", "content": system or _SYSTEM_PROMPT_NO_CONTEXT},
+                {"role": "user", "content": prompt}
+            ]
+        
+        # Never ask for more output than the context window has room for after the prompt
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        available = Config.DEEPSEEK_CONTEXT_WINDOW - prompt_tokens - 256
+        if available < _MIN_OUTPUT_TOKENS:
+            # The API would reject this after a full round-trip and prefill - fail before sending
+            raise ValueError(
+                f"Prompt (~{prompt_tokens} tokens) leaves no room for a response in the "
+                f"{Config.DEEPSEEK_CONTEXT_WINDOW}-token context window; truncate the prompt or "
+                f"context by at least {_MIN_OUTPUT_TOKENS - available} tokens"
+            )
+        if max_tokens > available:
+            logger.info(f"Clamping max_tokens from {max_tokens} to {available} (prompt ~{prompt_tokens} tokens)")
+            max_tokens = available
+
+        return {
+            **self._base_request,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+    
+    def stream_response(self,
+                        prompt: str,
+                        context: Optional[str] = None,
+                        temperature: float = None,
+                        max_tokens: int = None,
+                        system: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream a response from DeepSeek, yielding content chunks as they are generated
+        
+        Errors - including a prompt too large for the context window - are raised while
+        iterating, not when the stream is created.
+        """
+        request_data = self._build_request(prompt, context, temperature, max_tokens, stream=True, system=system)
+        yield from self._stream_request("chat/completions", request_data)
+    
+    def generate_response(self, 
+                         prompt: str, 
+                         context: Optional[str] = None,
+                         temperature: float = None,
+                         max_tokens: int = None,
+                         force_refresh: bool = False,
+                         stream: bool = False,
+                         system: Optional[str] = None) -> LLMMessage:
+        """
+        Generate a response from DeepSeek
+        
+        force_refresh bypasses the response cache; stream consumes the response as
+        server-sent events instead of waiting for one fully buffered body;
+        system replaces the default system prompt with task-specific static instructions.
+        """
+        try:
+            # Inside the try so an oversized prompt comes back as an error message like any other failure
+            request_data = self._build_request(prompt, context, temperature, max_tokens, stream=stream, system=system)
+            messages = request_data["messages"]
+            max_tokens = request_data["max_tokens"]
             
-            return self.generate_response(prompt, research_context, temperature=0.3, max_tokens=Config.DEEPSEEK_STAGE9_MAX_TOKENS)
+            if stream:
+                # Append deltas to one growing buffer rather than materializing a list of fragments
+                buffer = io.StringIO()
+                for delta in self._stream_request("chat/completions", request_data, force_refresh=force_refresh):
+                    buffer.write(delta)
+                content = buffer.getvalue()
+                buffer.close()
+            else:
+                response_data = self._make_request("chat/completions", request_data, force_refresh=force_refresh)
+                # Extract the response content
+                content = response_data["choices"][0]["message"]["content"]
+            
+            # Size stats are informational only - log them off the caller's thread
+            if logger.isEnabledFor(logging.INFO):
+                try:
+                    self._log_pool.submit(self._log_response_stats, messages, content, max_tokens)
+                except RuntimeError:
+                    # The shared pool was shut down (process exit) - log here rather than fail the response
+                    self._log_response_stats(messages, content, max_tokens)
+            
+            # Create LLM message
+            return _response_message(content)
+            
+        except Exception as e:
+            logger.error(f"Failed to generate DeepSeek response: {e}")
+            # Return a fallback message
+            return _error_message(e)
     
-    def validate_quality(self, content: str, criteria: List[str]) -> Dict[str, Any]:
-        """Validate the quality of generated content against specific criteria"""
+    def generate_responses_batch(self, requests: List[Dict[str, Any]]) -> List[LLMMessage]:
+        """
+        Run several independent generate_response calls concurrently, results in request order
+        
+        Each entry holds generate_response keyword arguments. Up to
+        DEEPSEEK_MAX_CONCURRENT_REQUESTS are in flight at once over the shared keep-alive pool,
+        so N prompts cost roughly one round trip of wall clock instead of N. A request that
+        raises becomes an error message in its slot rather than failing the batch.
+        """
+        if not requests:
+            return []
+        
+        def run(kwargs: Dict[str, Any]) -> LLMMessage:
+            try:
+                return self.generate_response(**kwargs)
+            except Exception as e:
+                logger.error(f"Batched DeepSeek request failed: {e}")
+                return _error_message(e)
+        
+        max_workers = max(1, min(len(requests), Config.DEEPSEEK_MAX_CONCURRENT_REQUESTS))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(run, requests))
+    
+    def _log_response_stats(self, messages: List[Dict[str, str]], content: str, max_tokens: int):
+        """Log prompt and response sizes (character estimate, no re-serialization)"""
+        if logger.isEnabledFor(logging.DEBUG):
+            prompt_len = sum(len(m.get("content", "")) for m in messages)
+            logger.debug(f"DeepSeek request size: ~{prompt_len} chars, response size: {len(content)} chars, max_tokens: {max_tokens}")
+        logger.info(f"DeepSeek response generated: {len(content)} characters")
+    
+    @classmethod
+    def shutdown_shared(cls):
+        """
+        Flush pending log work and release the process-wide session, caches and log worker
+        
+        Registered with atexit. Clients created before the call keep their references to the
+        released resources, so build new clients afterwards (they recreate everything).
+        """
+        with cls._shared_lock:
+            session, log_pool = cls._shared_session, cls._shared_log_pool
+            cls._shared_session = None
+            cls._shared_cache = None
+            cls._shared_semantic = None
+            cls._shared_log_pool = None
+        if log_pool is not None:
+            log_pool.shutdown(wait=True)
+        if session is not None:
+            session.close()
+    
+    def analyze_research_context(self, 
+                               user_prompt: str,
+                               research_context: str) -> LLMMessage:
+        """Analyze research context and provide comprehensive implementation foundation"""
+        
+        research_context = self._prepare_context(research_context)
+        prompt = _ANALYSIS_PROMPT.substitute(user_prompt=user_prompt, research_context=_CONTEXT_REFERENCE)
+        
+        return self.generate_response(prompt, research_context, max_tokens=Config.DEEPSEEK_STAGE5_MAX_TOKENS)
+    
+    def refine_analysis(self,
+                       user_prompt: str,
+                       research_context: str,
+                       ollama_analysis: str) -> LLMMessage:
+        """Refine analysis based on Ollama's input"""
+        
+        research_context = self._prepare_context(research_context)
+        prompt = _REFINE_PROMPT.substitute(
+            user_prompt=user_prompt,
+            research_context=_CONTEXT_REFERENCE,
+            ollama_analysis=ollama_analysis
+        )
+        
+        return self.generate_response(prompt, research_context, max_tokens=Config.DEEPSEEK_STAGE2_MAX_TOKENS)
+    
+    def continue_discussion(self, user_prompt: str, research_context: str, ollama_response: str) -> LLMMessage:
+        """Continue the discussion based on Ollama's latest points"""
+        logger.info("DeepSeek continuing discussion")
+        
+        # Truncate long responses for context
+        ollama_response = self._smart_truncate(ollama_response, Config.OLLAMA_TRUNCATE_TOKENS,
+                                               "... [truncated for discussion]")
+        
+        research_context = self._prepare_context(research_context)
+        prompt = _CONTINUE_DISCUSSION_PROMPT.substitute(
+            user_prompt=user_prompt,
+            ollama_response=ollama_response,
+            research_context=_CONTEXT_REFERENCE
+        )
+        
+        return self.generate_response(prompt, research_context, max_tokens=Config.DEEPSEEK_STAGE5_MAX_TOKENS)
+    
+    # ==================== NEW: OPTIMIZED DOCUMENT WORKFLOW ====================
+    
+    def create_document_outline(self, 
+                               doc_number: int,
+                               doc_type: str,
+                               user_prompt: str,
+                               research_context: str,
+                               conversation_summary: str) -> LLMMessage:
+        """Create COMPREHENSIVE outline for PRODUCTION-READY documentation (8K detailed outline)"""
+        
+        research_context = self._prepare_context(research_context)
+        if Config.DEEPSEEK_OUTLINE_PARALLEL_PHASES:
+            outline = self._create_outline_by_phase(doc_number, doc_type, user_prompt,
+                                                    research_context, conversation_summary)
+            if outline is not None:
+                return outline
+        
+        # Build a clean prompt without embedded code to avoid Python syntax issues
+        prompt = _OUTLINE_PROMPT.substitute(
+            doc_number=doc_number,
+            doc_type=doc_type,
+            user_prompt=user_prompt,
+            research_context=_CONTEXT_REFERENCE,
+            conversation_summary=conversation_summary[:8000]
+        )
+
+        return self.generate_response(prompt, research_context, temperature=0.3, max_tokens=Config.DEEPSEEK_OUTLINE_MAX_TOKENS,
+                                      stream=True)
+    
+    def _create_outline_by_phase(self,
+                                 doc_number: int,
+                                 doc_type: str,
+                                 user_prompt: str,
+                                 research_context: str,
+                                 conversation_summary: str) -> Optional[LLMMessage]:
+        """
+        Outline each phase in its own concurrent request and join them in order
+        
+        Decoding is sequential, so ten short generations in parallel finish in roughly the
+        time of one. Every request starts with the same research prefix, which the provider's
+        prompt cache can share. Returns None if any phase fails so the caller can fall back
+        to the single-request outline.
+        """
+        fields = {
+            "doc_number": doc_number,
+            "doc_type": doc_type,
+            "user_prompt": user_prompt,
+            "research_context": _CONTEXT_REFERENCE,  # The research goes once, as the context message
+            "conversation_summary": conversation_summary[:8000]
+        }
+        phase_max_tokens = max(2000, Config.DEEPSEEK_OUTLINE_MAX_TOKENS // len(_OUTLINE_PHASE_PROMPTS))
+        phases = self.generate_responses_batch([
+            {"prompt": template.substitute(fields), "context": research_context, "temperature": 0.3,
+             "max_tokens": phase_max_tokens, "stream": True}
+            for template in _OUTLINE_PHASE_PROMPTS
+        ])
         
-        criteria_text = "\n".join([f"- {criterion}" for criterion in criteria])
+        failed = sum(1 for phase in phases if phase.confidence_score == 0.0)
+        if failed:
+            logger.warning(f"{failed} of {len(phases)} outline phases failed for {doc_type}, using a single request")
+            return None
         
-        prompt = f"""
-        Please evaluate the following content against these quality criteria:
+        parts = [_OUTLINE_HEADER.substitute(doc_type=doc_type)]
+        parts.extend(phase.content.strip() for phase in phases)
+        return LLMMessage(
+            llm_type=LLMType.DEEPSEEK,
+            content="\n\n".join(parts),
+            confidence_score=min(phase.confidence_score for phase in phases)
+        )
+    
+    def create_research_summary(self,
+                               doc_type: str,
+                               research_context: str,
+                               user_prompt: str) -> LLMMessage:
+        """Compress 128K research into 2-3K summary relevant to specific document"""
+        
+        prompt = _RESEARCH_SUMMARY_PROMPT.substitute(
+            doc_type=doc_type,
+            user_prompt=user_prompt,
+            research_context=research_context[:20000]
+        )
 
-        CONTENT TO EVALUATE:
-        {content}
+        return self.generate_response(prompt, research_context, temperature=0.2, max_tokens=3000)
+    
+    def review_document_accuracy(self,
+                                document_content: str,
+                                original_outline: str,
+                                research_context: str,
+                                doc_title: str) -> LLMMessage:
+        """Review Ollama's document against research for technical accuracy"""
+        
+        prompt = _REVIEW_PROMPT.substitute(
+            doc_title=doc_title,
+            original_outline=original_outline[:3000],
+            document_content=document_content[:6000],
+            research_context=_CONTEXT_REFERENCE
+        )
 
-        QUALITY CRITERIA:
-        {criteria_text}
+        return self.generate_response(prompt, research_context, temperature=0.3, max_tokens=5000)
+    
+    def generate_multiple_documents(self,
+                                  user_prompt: str,
+                                  research_context: str,
+                                  conversation_summary: str) -> List[Dict[str, Any]]:
+        """Generate multiple specialized documents for comprehensive implementation"""
+        if not Config.RESEARCH_AI_MEMPROF:
+            return self._generate_multiple_documents(user_prompt, research_context, conversation_summary)
+        
+        # Debug aid: report what the document path left allocated, to catch retained prompts/responses
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(25)
+        before = tracemalloc.take_snapshot()
+        try:
+            return self._generate_multiple_documents(user_prompt, research_context, conversation_summary)
+        finally:
+            after = tracemalloc.take_snapshot()
+            top = after.compare_to(before, "lineno")[:20]
+            logger.info("Document generation memory diff:\n" + "\n".join(str(stat) for stat in top))
+            if started:
+                tracemalloc.stop()
+    
+    def _generate_multiple_documents(self,
+                                     user_prompt: str,
+                                     research_context: str,
+                                     conversation_summary: str) -> List[Dict[str, Any]]:
+        documents = []
+        
+        # Upper bound on any one document's output budget; each document reserves its own estimate below
+        doc_ceiling = Config.DEEPSEEK_COMPREHENSIVE_DOC_MAX_TOKENS
+        
+        specs = _DOCUMENT_SPECS
+        
+        # Every document prompt embeds the research - condense it once instead of paying for the raw corpus per call
+        research_context = self._compress_research(user_prompt, research_context)
+        
+        # Reserve output per document from the number of sections its template asks for
+        doc_budgets = [self._estimate_max_tokens(spec["prompt"].template, ceiling=doc_ceiling) for spec in specs]
+        logger.info(f"Generating {len(specs)} production-ready documents with max tokens {doc_budgets}")
+        
+        # Documents are independent - build every request up front and send them as one concurrent batch
+        batch = [
+            self._document_request(spec, user_prompt, research_context, conversation_summary, budget)
+            for spec, budget in zip(specs, doc_budgets)
+        ]
+        for number, (spec, doc) in enumerate(zip(specs, self.generate_responses_batch(batch)), 1):
+            documents.append(self._document_entry(spec, doc.content))
+            if doc.confidence_score > 0:
+                logger.info(f"Document {number} generated successfully")
+            else:
+                logger.error(f"Failed to generate document {number} ({spec['title']})")
 
-        For each criterion, provide:
-        - A score from 0.0 to 1.0
-        - Specific feedback on strengths and weaknesses
-        - Suggestions for improvement
+        logger.info(f"Generated {len(documents)} documents ({sum(doc['size'] for doc in documents):,} chars total)")
+        return documents
+    
+    def _document_entry(self, spec: Dict[str, Any], content: str) -> Dict[str, Any]:
+        """Document record returned to callers; size is recorded once so stats never re-measure content"""
+        return {
+            "title": spec["title"],
+            "filename": spec["filename"],
+            "content": content,
+            "category": spec["category"],
+            "size": len(content)
+        }
+    
+    def _estimate_max_tokens(self, prompt: str, floor: int = 2000, ceiling: Optional[int] = None) -> int:
+        """Size an output budget from the sections a prompt asks for (~800 tokens each), within [floor, ceiling]"""
+        if ceiling is None:
+            ceiling = Config.DEEPSEEK_STAGE9_MAX_TOKENS
+        sections = len(_SECTION_RE.findall(prompt))
+        return min(ceiling, max(floor, sections * 800))
+    
+    def _compress_research(self, user_prompt: str, research_context: str) -> str:
+        """Condense a large research context into a token-capped summary (unchanged if already small)"""
+        if count_tokens(research_context) <= Config.DEEPSEEK_COMPRESS_CONTEXT_MIN_TOKENS:
+            return research_context
+        
+        summary = self.create_research_summary("Complete implementation documentation suite", research_context, user_prompt)
+        if summary.confidence_score == 0.0 or not summary.content.strip():
+            logger.warning("Research summary failed, using the full research context")
+            return research_context
+        
+        compressed = truncate_to_tokens(summary.content, Config.DEEPSEEK_COMPRESSED_CONTEXT_TOKENS)
+        logger.info(f"Compressed research context from {len(research_context):,} to {len(compressed):,} chars")
+        return compressed
+    
+    def _document_request(self,
+                          spec: Dict[str, str],
+                          user_prompt: str,
+                          research_context: str,
+                          conversation_summary: str,
+                          max_tokens: int) -> Dict[str, Any]:
+        """generate_response arguments for a single document described by an entry of _DOCUMENT_SPECS"""
+        return {
+            "prompt": self._build_document_prompt(spec, user_prompt, conversation_summary),
+            "context": research_context,
+            "temperature": 0.3,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+    
+    def _build_document_prompt(self,
+                               spec: Dict[str, str],
+                               user_prompt: str,
+                               conversation_summary: str) -> str:
+        """Fill a document spec's prompt template (the research itself goes in the context message)"""
+        return spec["prompt"].substitute(
+            user_prompt=user_prompt,
+            research_context=_CONTEXT_REFERENCE,
+            conversation_summary=conversation_summary[:8000]
+        )
+    
+    def generate_final_plan(self,
+                          user_prompt: str,
+                          research_context: str,
+                          conversation_summary: str) -> LLMMessage:
+        """Generate final development plan - now creates multiple documents"""
+        
+        # Check if we have enough content for multiple documents (measured in model tokens, not chars)
+        total_content_tokens = count_tokens(research_context) + count_tokens(conversation_summary)
+        
+        if total_content_tokens > Config.DEEPSEEK_MULTI_DOC_MIN_TOKENS:  # Substantial content - create multiple documents
+            logger.info("Generating multiple specialized documents due to comprehensive content")
+            
+            # Generate multiple documents
+            documents = self.generate_multiple_documents(user_prompt, research_context, conversation_summary)
+            
+            # Create a summary document that references all the specialized documents
+            parts = [_SUITE_SUMMARY_HEADER.format(count=len(documents), user_prompt=user_prompt)]
+            parts.extend(
+                _SUITE_SUMMARY_DOC_LINE.format(number=i, title=doc['title'], filename=doc['filename'],
+                                               category=doc['category'].title(), size=doc['size'])
+                for i, doc in enumerate(documents, 1)
+            )
+            parts.append(_SUITE_SUMMARY_FOOTER)
+            summary_content = "".join(parts)
 
-        Return your evaluation in a structured format.
+            # Store the documents for download (this will be handled by the file manager)
+            return LLMMessage(
+                llm_type=LLMType.DEEPSEEK,
+                content=summary_content,
+                confidence_score=0.9,
+                metadata={"documents": documents, "multi_document": True}
+            )
+        
+        else:
+            # Fall back to single comprehensive document for smaller projects
+            logger.info("Generating single comprehensive document due to limited content")
+            
+            prompt = _SINGLE_DOCUMENT_PROMPT.substitute(
+                user_prompt=user_prompt,
+                research_context=_CONTEXT_REFERENCE,
+                conversation_summary=conversation_summary
+            )
+            
+            return self.generate_response(prompt, research_context, temperature=0.3, max_tokens=Config.DEEPSEEK_STAGE9_MAX_TOKENS,
+                                          stream=True)
+    
+    def validate_quality(self, content: str, criteria: List[str]) -> Dict[str, Any]:
         """
+        Validate the quality of generated content against specific criteria
         
-        response = self.generate_response(prompt)
+        Each criterion is scored by its own short request, all sent concurrently, so wall
+        clock is about one short reply. The trade-off is input tokens: every request carries
+        the full content, so prefill grows with the number of criteria (the shared content
+        prefix is what the provider's prompt cache can reuse). The score is read from the
+        first line of each reply only; a missing or out-of-range value leaves that criterion
+        unscored instead of being clamped.
+        """
+        # Short replies - no need to reserve the default budget
+        responses = self.generate_responses_batch([
+            {"prompt": _QUALITY_REQUEST.substitute(content=content, criterion=criterion),
+             "max_tokens": Config.DEEPSEEK_VALIDATION_MAX_TOKENS, "system": _QUALITY_SYSTEM}
+            for criterion in criteria
+        ])
         
-        # Parse the response to extract quality scores
-        # This is a simplified implementation - in practice you'd want more sophisticated parsing
         quality_scores = {}
-        
-        # Extract scores from response (this would be more sophisticated in production)
-        lines = response.content.split('\n')
-        for line in lines:
-            if 'score' in line.lower() and ':' in line:
-                parts = line.split(':')
-                if len(parts) >= 2:
-                    criterion = parts[0].strip().lower()
-                    score_text = parts[1].strip()
-                    try:
-                        # Extract first number from the score text
-                        import re
-                        numbers = re.findall(r"[-+]?\d*\.\d+|\d+", score_text)
-                        if numbers:
-                            quality_scores[criterion] = float(numbers[0])
-                    except (ValueError, IndexError):
-                        continue
+        feedback = []
+        for criterion, response in zip(criteria, responses):
+            feedback.append(f"{criterion}: {response.content.strip()}")
+            score = self._parse_quality_score(response)
+            if score is not None:
+                quality_scores[criterion.strip().lower()] = score
+            else:
+                logger.warning(f"No 0-1 score on the first line of the '{criterion}' evaluation, leaving it unscored")
         
         return {
             'overall_score': sum(quality_scores.values()) / len(quality_scores) if quality_scores else 0.0,
             'criterion_scores': quality_scores,
-            'feedback': response.content
+            'feedback': "\n\n".join(feedback)
         }
     
+    def _parse_quality_score(self, response: LLMMessage) -> Optional[float]:
+        """The 0-1 score _QUALITY_SYSTEM asks for on the reply's first line, or None"""
+        if response.confidence_score == 0:
+            return None
+        first_line = response.content.strip().split("\n", 1)[0]
+        match = _NUMBER_RE.search(first_line)
+        if not match:
+            return None
+        score = float(match.group())
+        return score if 0.0 <= score <= 1.0 else None
+    
+    def _stream_json(self, prompt: str, expected: type, system: str, max_tokens: int) -> Tuple[Optional[Any], str]:
+        """
+        Stream a response and stop reading once its first JSON object/array has closed
+        
+        Returns (parsed value or None, text received). Anything the model would write after
+        the JSON is never waited for; an early-closed stream is not cached, so the parsed
+        value is what callers should keep.
+        """
+        scanner = _JsonCloseScanner(expected)
+        parts = []
+        value = None
+        stream = None
+        try:
+            stream = self.stream_response(prompt, max_tokens=max_tokens, system=system)
+            for delta in stream:
+                parts.append(delta)
+                if scanner.feed(delta):
+                    value = _extract_first_json("".join(parts), expected)
+                    if value is not None:
+                        break
+        except Exception as e:
+            logger.error(f"Failed to generate DeepSeek response: {e}")
+            return None, _ERROR_TEMPLATE.format(err=e)
+        finally:
+            if stream is not None:
+                stream.close()  # Releases the connection when we stop early
+        
+        content = "".join(parts)
+        if value is None:
+            value = _extract_first_json(content, expected)
+        return value, content
+    
     def generate_research_plan(self, user_prompt: str) -> Dict[str, Any]:
         """Generate comprehensive research queries focused on complete implementation"""
         
-        research_prompt = f"""You are a research expert. For the following project request: "{user_prompt}"
-
-Generate 8-12 comprehensive search queries that would gather ALL information needed for complete implementation from start to finish. Focus on:
-
-**CORE IMPLEMENTATION RESEARCH:**
-1. Technology stack and framework recommendations with specific versions
-2. System architecture patterns and design principles
-3. Database design and data modeling best practices
-4. API design patterns and implementation examples
-
-**DETAILED IMPLEMENTATION GUIDANCE:**
-5. Step-by-step implementation tutorials and code examples
-6. Production deployment strategies and infrastructure setup
-7. Security implementation and authentication patterns
-8. Testing strategies and quality assurance approaches
+        research_prompt = _RESEARCH_PLAN_REQUEST.substitute(user_prompt=user_prompt)
 
-**OPERATIONAL & MAINTENANCE RESEARCH:**
-9. Performance optimization and monitoring solutions
-10. Error handling and fault tolerance patterns
-11. Scalability considerations and load balancing
-12. DevOps practices and CI/CD pipeline setup
-
-**PRACTICAL CONSIDERATIONS:**
-13. Common pitfalls and troubleshooting guides
-14. Resource requirements and timeline estimation
-15. Team structure and development workflow
-16. Documentation and maintenance strategies
-
-Return your response as a JSON object with this structure:
-{{
-    "queries": [
-        "specific technical implementation query 1",
-        "specific deployment and setup query 2",
-        "specific architecture pattern query 3",
-        ...
-    ],
-    "research_focus": "comprehensive implementation and deployment guidance"
-}}
-
-Make each query specific, technical, and focused on actionable implementation details. Include queries for setup guides, code examples, production deployment, and operational procedures."""
-
-        response = self.generate_response(research_prompt, max_tokens=Config.DEEPSEEK_STAGE4_MAX_TOKENS)
+        research_plan, content = self._stream_json(research_prompt, dict, _RESEARCH_PLAN_SYSTEM,
+                                                   Config.DEEPSEEK_STAGE4_MAX_TOKENS)
         
-        try:
-            # Try to parse JSON from the response
-            import json
-            import re
-            
-            content = response.content
-            # Look for JSON object in the response
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                research_plan = json.loads(json_str)
-                logger.info(f"Successfully parsed research plan with {len(research_plan.get('queries', []))} queries")
-                return research_plan
-            else:
-                logger.warning("No JSON found in research plan response, using fallback")
-                
-        except Exception as e:
-            logger.error(f"Failed to parse research plan JSON: {e}")
+        if research_plan is not None:
+            logger.info(f"Successfully parsed research plan with {len(research_plan.get('queries', []))} queries")
+            return research_plan
+        logger.warning("No JSON found in research plan response, using fallback")
         
-        # Fallback: extract queries from text
-        lines = response.content.split('\n')
-        queries = []
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#') and len(line) > 10:
-                # Remove common prefixes and clean up
-                line = re.sub(r'^[\d\.\-\*\+\>\s]*', '', line)
-                line = line.strip('"\'')
-                if line and len(line) > 10:
-                    queries.append(line)
+        # Fallback: extract queries from text, removing common prefixes and quotes
+        lines = (line.strip() for line in content.split('\n'))
+        cleaned = (line[_LIST_PREFIX.match(line).end():].strip('"\'')
+                   for line in lines if len(line) > 10 and not line.startswith('#'))
+        queries = [line for line in cleaned if len(line) > 10]
         
         return {
             "queries": queries[:8],  # Limit to 8 queries
             "research_focus": "Technical implementation and best practices"
         }
     
-    def extract_research_insights(self, user_prompt: str, search_results: List) -> List[Dict[str, Any]]:
+    def extract_research_insights(self, user_prompt: str, search_results: List[SearchResult]) -> List[Dict[str, Any]]:
         """Extract key insights from search results using LLM analysis"""
         
-        # Prepare search results summary
-        results_summary = ""
-        for i, result in enumerate(search_results[:10], 1):  # Limit to top 10 results
-            title = getattr(result, 'title', 'Unknown')
-            snippet = getattr(result, 'snippet', 'No description')
-            results_summary += f"{i}. {title}\n   {snippet}\n\n"
+        # Prepare search results summary (top 10 results)
+        results_summary = "".join(
+            f"{i}. {result.title or 'Unknown'}\n   {result.snippet or 'No description'}\n\n"
+            for i, result in enumerate(search_results[:10], 1)
+        )
         
-        insight_prompt = f"""Analyze these search results for the request: "{user_prompt}"
-
-SEARCH RESULTS:
-{results_summary}
-
-Extract 5-8 key insights that would be most valuable for understanding and implementing this request. Focus on:
+        insight_prompt = _RESEARCH_INSIGHTS_REQUEST.substitute(user_prompt=user_prompt, results_summary=results_summary)
 
-1. Technical architecture patterns
-2. Implementation strategies  
-3. Tool and framework recommendations
-4. Performance considerations
-5. Common challenges and solutions
-6. Best practices and patterns
-
-Return insights as a JSON array:
-[
-    {{
-        "insight": "specific technical insight",
-        "source": "which search result(s) this came from",
-        "relevance": "why this matters for the request"
-    }},
-    ...
-]
-
-Make insights actionable and technically specific."""
-
-        response = self.generate_response(insight_prompt, max_tokens=Config.DEEPSEEK_STAGE4_MAX_TOKENS)
+        insights_data, content = self._stream_json(insight_prompt, list, _RESEARCH_INSIGHTS_SYSTEM,
+                                                   Config.DEEPSEEK_STAGE4_MAX_TOKENS)
         
-        try:
-            # Try to parse JSON array from response
-            import json
-            import re
-            
-            content = response.content
-            # Look for JSON array in the response
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                insights_data = json.loads(json_str)
-                
-                # Convert to the expected format
-                insights = []
-                for item in insights_data:
-                    if isinstance(item, dict) and 'insight' in item:
-                        insights.append({
-                            'content': item['insight'],
-                            'source': item.get('source', 'search results'),
-                            'relevance_score': 0.8,
-                            'type': 'technical_insight'
-                        })
-                
-                logger.info(f"Successfully extracted {len(insights)} insights from search results")
-                return insights
-                
-        except Exception as e:
-            logger.error(f"Failed to parse insights JSON: {e}")
+        if insights_data is not None:
+            # Convert to the expected format
+            insights = [
+                {
+                    'content': item['insight'],
+                    'source': item.get('source', 'search results'),
+                    'relevance_score': 0.8,
+                    'type': 'technical_insight'
+                }
+                for item in insights_data
+                if isinstance(item, dict) and 'insight' in item
+            ]
+            logger.info(f"Successfully extracted {len(insights)} insights from search results")
+            return insights
+        logger.warning("No JSON found in insights response, using fallback")
         
-        # Fallback: extract insights from text
-        lines = response.content.split('\n')
+        # Fallback: extract insights from text (stop as soon as 8 are found)
         insights = []
-        current_insight = ""
         
-        for line in lines:
+        for line in content.split('\n'):
             line = line.strip()
             if line and not line.startswith('#'):
                 # Remove list prefixes and clean up
-                line = re.sub(r'^[\d\.\-\*\+\>\s]*', '', line)
+                line = line[_LIST_PREFIX.match(line).end():]
                 line = line.strip('"\'')
                 
                 if len(line) > 20:  # Reasonable insight length
@@ -1100,5 +1792,11 @@ Make insights actionable and technically specific."""
                         'relevance_score': 0.7,
                         'type': 'extracted_insight'
                     })
+                    if len(insights) == 8:  # Limit to 8 insights
+                        break
         
-        return insights[:8]  # Limit to 8 insights
\ No newline at end of file
+        return insights
+
+
+# Flush the log worker and close the shared keep-alive pool when the process exits
+atexit.register(DeepSeekClient.shutdown_shared)
@@ -0,0 +1,263 @@
+import json
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # semantic caching is optional - only exact-match caching without these
+    np = None
+    SentenceTransformer = None
+
+try:
+    import faiss
+except ImportError:  # optional - semantic lookups fall back to a numpy inner-product scan
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request payload (keys sorted so dict order doesn't matter)"""
+    if orjson is not None:
+        canonical = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    else:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(canonical, digest_size=32).hexdigest()
+
+
+class LLMCache:
+    """
+    In-process LRU cache of LLM responses with a per-entry TTL
+    
+    When a directory is given, entries are also written there as one JSON file per
+    key so responses survive restarts; a memory miss falls through to disk.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on miss/expiry"""
+        value = self._lookup(key)
+        with self._lock:
+            self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+        
+        if not self.directory:
+            return None
+        remaining, value = self._read_disk(key)
+        if value is None:
+            return None
+        # Promote into memory for the rest of its lifetime
+        self._store(key, value, remaining)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store value under key, evicting the least recently used entry if full"""
+        ttl = self.ttl if ttl is None else ttl
+        self._store(key, value, ttl)
+        if self.directory:
+            self._write_disk(key, value, ttl)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, value: Any, ttl: float):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> tuple:
+        """Return (remaining ttl, value) for a persisted entry, or (0, None) on miss/expiry"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            entry = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except FileNotFoundError:
+            return 0, None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return 0, None
+        
+        # Wall-clock time on disk - monotonic clocks don't survive a restart
+        remaining = entry.get("expires_at", 0) - time.time()
+        if remaining <= 0:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return 0, None
+        return remaining, entry.get("value")
+
+    def _write_disk(self, key: str, value: Any, ttl: float):
+        entry = {"expires_at": time.time() + ttl, "value": value}
+        try:
+            raw = orjson.dumps(entry) if orjson is not None else json.dumps(entry).encode("utf-8")
+            # Write then rename so a concurrent reader never sees a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(raw)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError) as e:
+            logger.warning(f"Failed to persist cache entry {key}: {e}")
+
+
+class _ScopeIndex:
+    """
+    Normalized embeddings and their values for one semantic-cache scope
+    
+    Searched by inner product (cosine similarity for unit vectors) with a FAISS flat
+    index when faiss is installed, otherwise with one numpy matrix-vector product.
+    Row i of the index always belongs to values[i].
+    """
+
+    def __init__(self, dim: int):
+        self.values: list = []
+        if faiss is not None:
+            self._index = faiss.IndexFlatIP(dim)
+        else:
+            self._matrix = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, embedding, value: Any):
+        row = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        if faiss is not None:
+            self._index.add(row)
+        else:
+            self._matrix = np.vstack([self._matrix, row])
+        self.values.append(value)
+
+    def pop_oldest(self):
+        if faiss is not None:
+            self._index.remove_ids(np.array([0], dtype=np.int64))
+        else:
+            self._matrix = self._matrix[1:]
+        del self.values[0]
+
+    def search(self, embedding) -> tuple:
+        """(similarity, value) of the nearest entry, or (-1.0, None) when empty"""
+        if not self.values:
+            return -1.0, None
+        query = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        if faiss is not None:
+            similarities, rows = self._index.search(query, 1)
+            best, similarity = int(rows[0, 0]), float(similarities[0, 0])
+        else:
+            similarities = self._matrix @ query[0]
+            best = int(similarities.argmax())
+            similarity = float(similarities[best])
+        return similarity, self.values[best]
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache for paraphrased prompts
+    
+    Prompts are embedded with a sentence-transformers model; a lookup returns the
+    stored value whose prompt has cosine similarity >= threshold. Entries are
+    partitioned by scope (model, system prompt, parameters) so only otherwise
+    identical requests can match.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", threshold: float = 0.92, max_entries: int = 256):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._model = None
+        self._scopes: Dict[str, _ScopeIndex] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        return SentenceTransformer is not None
+
+    def _embed(self, text: str):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    logger.info(f"Loading semantic cache embedding model: {self.model_name}")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(text, normalize_embeddings=True)
+
+    def get(self, scope: str, text: str) -> Optional[Any]:
+        """Return the value cached for the most similar prompt in scope, or None"""
+        with self._lock:
+            if not self._scopes.get(scope):
+                self.stats["misses"] += 1
+                return None
+        embedding = self._embed(text)
+        with self._lock:
+            index = self._scopes.get(scope)
+            similarity, value = index.search(embedding) if index is not None else (-1.0, None)
+            hit = similarity >= self.threshold
+            self.stats["hits" if hit else "misses"] += 1
+        if not hit:
+            return None
+        logger.info(f"Semantic cache hit (similarity {similarity:.3f})")
+        return value
+
+    def set(self, scope: str, text: str, value: Any):
+        """Remember value for text within scope, dropping the oldest entry when full"""
+        embedding = self._embed(text)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None:
+                index = self._scopes[scope] = _ScopeIndex(len(embedding))
+            index.add(embedding, value)
+            if len(index) > self.max_entries:
+                index.pop_oldest()
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
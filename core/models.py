@@ -1,17 +1,23 @@
 import json
+import sys
 import uuid
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
 from enum import Enum
 
+# Python 3.10+ dataclasses can generate __slots__ (no per-instance __dict__)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-class LLMType(Enum):
+
+# The enums mix in str (StrEnum needs 3.11): members compare equal to their values and
+# serialize to JSON as plain strings.
+class LLMType(str, Enum):
     DEEPSEEK = "deepseek"
     OLLAMA = "ollama"
 
 
-class ConversationStage(Enum):
+class ConversationStage(str, Enum):
     # NEW STREAMLINED WORKFLOW - 5 Stages
     RESEARCH_PLANNING = "research_planning"           # 1. DeepSeek creates targeted research queries
     WEB_RESEARCH = "web_research"                     # 2. Serper performs parallel web searches
@@ -21,13 +27,13 @@ class ConversationStage(Enum):
     COMPLETED = "completed"                           # ✓ Documents ready for download
 
 
-class QualityLevel(Enum):
+class QualityLevel(str, Enum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class SearchResult:
     """Represents a single web search result"""
     title: str
@@ -39,7 +45,7 @@ class SearchResult:
     timestamp: datetime = field(default_factory=datetime.now)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class LLMMessage:
     """Represents a message from an LLM"""
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
@@ -52,7 +58,7 @@ class LLMMessage:
     metadata: Optional[Dict[str, Any]] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ResearchContext:
     """Main research context object that persists throughout conversation"""
     
@@ -106,25 +112,19 @@ class ResearchContext:
     
     def calculate_context_maturity(self) -> float:
         """Calculate overall context maturity score"""
-        scores = []
-        
         # Research coverage (30%)
-        if self.initial_searches or self.targeted_searches:
-            coverage_score = min(1.0, len(self.initial_searches + self.targeted_searches) / 10)
-            scores.append(coverage_score * 0.3)
+        searches = len(self.initial_searches) + len(self.targeted_searches)
+        coverage_score = min(1.0, searches / 10)
         
         # Conversation depth (30%)
         conversation_score = min(1.0, len(self.messages) / 20)
-        scores.append(conversation_score * 0.3)
         
         # Quality gate progress (20%)
         gate_score = len(self.quality_gates_passed) / 5  # 5 total gates
-        scores.append(gate_score * 0.2)
         
         # Decision confidence (20%)
-        scores.append(self.decision_confidence * 0.2)
-        
-        self.context_maturity = sum(scores)
+        self.context_maturity = (coverage_score * 0.3 + conversation_score * 0.3
+                                 + gate_score * 0.2 + self.decision_confidence * 0.2)
         return self.context_maturity
     
     def to_dict(self) -> Dict[str, Any]:
@@ -9,11 +9,30 @@ from pathlib import Path
 from typing import Dict, Any, Optional, List
 from core.models import ResearchContext, SearchResult, LLMMessage
 
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the stdlib encoder
+    orjson = None
+
 # Directory for storing session data
 SESSIONS_DIR = Path(__file__).parent.parent / "saved_sessions"
 SESSIONS_DIR.mkdir(exist_ok=True)
 
 
+def _dumps(data: Any) -> bytes:
+    """Pretty-printed UTF-8 JSON for a session file"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _load_file(path: Path) -> Any:
+    """Parse a session file"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
 def _serialize_research_context(context: ResearchContext) -> Dict[str, Any]:
     """Convert ResearchContext to JSON-serializable dict"""
     # Serialize search results from both initial and targeted searches
@@ -217,8 +236,8 @@ def save_session(session_id: str, session_data: Dict[str, Any]) -> bool:
         
         # Validate JSON serializability before writing
         try:
-            json_string = json.dumps(serialized, indent=2, ensure_ascii=False)
-            print(f"[SAVE] JSON validated, size: {len(json_string)} bytes")
+            json_bytes = _dumps(serialized)
+            print(f"[SAVE] JSON validated, size: {len(json_bytes)} bytes")
         except (TypeError, ValueError) as e:
             print(f"[SAVE] ERROR: Data is not JSON serializable: {e}")
             return False
@@ -228,15 +247,14 @@ def save_session(session_id: str, session_data: Dict[str, Any]) -> bool:
         temp_file = SESSIONS_DIR / f"{session_id}.json.tmp"
         
         print(f"[SAVE] Writing to temp file: {temp_file}")
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(json_string)
+        with open(temp_file, 'wb') as f:
+            f.write(json_bytes)
             f.flush()
             os.fsync(f.fileno())  # Force write to disk
         
         # Validate the written file
         print(f"[SAVE] Validating written file...")
-        with open(temp_file, 'r', encoding='utf-8') as f:
-            json.load(f)  # This will raise if JSON is invalid
+        _load_file(temp_file)  # This will raise if JSON is invalid
         
         # Atomic rename
         print(f"[SAVE] Atomically renaming to: {session_file}")
@@ -279,8 +297,7 @@ def load_session(session_id: str) -> Optional[Dict[str, Any]]:
         if not session_file.exists():
             return None
         
-        with open(session_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = _load_file(session_file)
         
         # Deserialize back to objects
         return {
@@ -308,8 +325,7 @@ def list_saved_sessions() -> List[Dict[str, str]]:
     try:
         for session_file in SESSIONS_DIR.glob("*.json"):
             try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = _load_file(session_file)
                 
                 sessions.append({
                     "session_id": data.get("session_id", session_file.stem),
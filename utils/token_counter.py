@@ -0,0 +1,67 @@
+"""
+Token Counting Utility
+Estimates prompt token counts so request budgets can be sized before calling an LLM
+"""
+import logging
+import threading
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional - fall back to a character heuristic
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Rough estimate used when no tokenizer is available: 1 token ≈ 4 characters
+CHARS_PER_TOKEN = 4
+
+_encoder = None
+_encoder_failed = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """Load the shared BPE encoder once (None if tiktoken is unavailable)"""
+    global _encoder, _encoder_failed
+    if _encoder is not None or _encoder_failed or tiktoken is None:
+        return _encoder
+    with _encoder_lock:
+        if _encoder is None and not _encoder_failed:
+            try:
+                _encoder = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # The encoding file is downloaded on first use - stay usable offline
+                logger.warning(f"tiktoken encoder unavailable, estimating tokens from length: {e}")
+                _encoder_failed = True
+    return _encoder
+
+
+@lru_cache(maxsize=64)
+def count_tokens(text: str) -> int:
+    """
+    Count (or estimate) the number of tokens in text
+    
+    Memoized: the same research context and discussion are measured for several
+    prompts per run, and str caches its own hash so repeat lookups are cheap.
+    """
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return len(text) // CHARS_PER_TOKEN
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "... [truncated]") -> str:
+    """Cut text down to at most max_tokens tokens, appending suffix when anything was dropped"""
+    if not text:
+        return text
+    encoder = _get_encoder()
+    if encoder is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= max_chars else text[:max_chars] + suffix
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoder.decode(tokens[:max_tokens]) + suffix